@@ -0,0 +1,165 @@
+""" Batch rendering of parameter sweeps from the command line.
+
+    A sweep spec is a json file like
+
+        {
+            "resolution": 512, "steps": 1000000, "seed": 0,
+            "color": true, "cmap": "jet",
+            "chaos_game": {"n": {"start": 3, "stop": 9},
+                           "r": {"start": 0.3, "stop": 0.6, "num": 4}},
+            "variations": [{"linear": 1}, {"linear": 0.5, "swirl": 0.5}],
+            "ifs": [{"name": "barnsley",
+                     "transforms": [[0, 0, 0, 0.16, 0, 0], ...],
+                     "probabilities": [0.01, 0.85, 0.07, 0.07]}]
+        }
+
+    Values of n and r are a list, a single value or a range; n ranges are
+    integer ranges with an exclusive stop and r ranges are np.linspace
+    arguments. Every combination of n, r and variation coefficient dict is
+    rendered, plus every IFS. The extent setting applies to the variations;
+    an IFS is framed by a short pre-run unless it has its own "extent".
+    Outputs that already exist are skipped.
+
+    Usage
+    -----
+    python batch_render.py sweep.json --out thumbnails --workers 32
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+from chaos_game import ChaosGame
+from fern import AffineTransform, IFS
+from render import DensityHistogram
+from variations import variation_histogram
+
+#: defaults of the render settings of a spec
+DEFAULTS = {"resolution": 512, "steps": 1_000_000, "seed": 0, "color": True,
+            "cmap": "jet", "extent": [-1, 1, -1, 1], "chunk_size": 1_000_000}
+
+
+def _values(value, integer=False):
+    """ Expand a single value, a list or a range dictionary into a list."""
+    if isinstance(value, dict):
+        if integer:
+            return list(range(value["start"], value["stop"], value.get("step", 1)))
+        return np.linspace(value["start"], value["stop"], value.get("num", 5)).tolist()
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [value]
+
+
+def _name(coeff):
+    return "-".join(f"{key}{coeff[key]:g}" for key in sorted(coeff))
+
+
+def expand_spec(spec):
+    """ Turn a sweep spec into a list of jobs.
+
+        Every job is a dictionary with the render settings, a kind
+        ("chaos_game" or "ifs"), the parameters of the generator and the
+        file name of the output.
+    """
+    settings = {key: spec.get(key, default) for key, default in DEFAULTS.items()}
+    jobs = []
+
+    if "chaos_game" in spec:
+        sweep = spec["chaos_game"]
+        coeffs = spec.get("variations", [None])
+        for n, r, coeff in itertools.product(_values(sweep.get("n", 3), integer=True),
+                                             _values(sweep.get("r", 0.5)), coeffs):
+            name = f"ngon-n{n}-r{r:.4g}" + (f"-{_name(coeff)}" if coeff else "")
+            jobs.append(dict(settings, kind="chaos_game", n=n, r=r, variation=coeff,
+                             filename=name + ".png"))
+
+    for k, system in enumerate(spec.get("ifs", [])):
+        name = system.get("name", f"ifs{k}")
+        jobs.append(dict(settings, kind="ifs", transforms=system["transforms"],
+                         probabilities=system["probabilities"], extent=system.get("extent"),
+                         filename=name + ".png"))
+    return jobs
+
+
+def render_job(job, directory):
+    """ Render one job into directory and return the path of the image."""
+    path = os.path.join(directory, job["filename"])
+
+    if job["kind"] == "chaos_game":
+        game = ChaosGame(job["n"], job["r"], job["seed"])
+        coeff = job["variation"]
+        color = job["color"]
+        chunks = game.iterate_chunks(job["steps"], chunk_size=job["chunk_size"], color=color,
+                                     dtype=np.float32)
+        if coeff is None:
+            histogram = DensityHistogram(job["resolution"], game._extent(), color)
+            for chunk in chunks:
+                histogram.add(chunk[0], chunk[2] if color else None)
+        else:
+            histogram = variation_histogram(chunks, coeff, job["resolution"], job["extent"], color)
+        color_range = (0, job["n"] - 1)
+    else:
+        transforms = [AffineTransform(*values) for values in job["transforms"]]
+        ifs = IFS(transforms, job["probabilities"], job["seed"])
+        chunks = ifs.iterate_chunks(job["steps"], chunk_size=job["chunk_size"], dtype=np.float32)
+        histogram = DensityHistogram(job["resolution"], job["extent"] or ifs._extent())
+        for points in chunks:
+            histogram.add(points)
+        color_range = None
+
+    partial = path + ".partial.png"
+    histogram.savepng(partial, job["cmap"], color_range)
+    os.replace(partial, path)
+    return path
+
+
+def run(jobs, directory, workers=None, force=False, report=print):
+    """ Render all jobs whose output does not exist yet in a process pool.
+
+        Returns
+        -------
+        List of the paths rendered.
+    """
+    os.makedirs(directory, exist_ok=True)
+    todo = [job for job in jobs
+            if force or not os.path.exists(os.path.join(directory, job["filename"]))]
+    report(f"{len(jobs) - len(todo)} of {len(jobs)} images exist already, rendering {len(todo)}")
+
+    rendered = []
+    start = time.perf_counter()
+    if workers == 1:
+        results = (render_job(job, directory) for job in todo)
+    else:
+        pool = ProcessPoolExecutor(workers)
+        results = (future.result() for future in
+                   as_completed([pool.submit(render_job, job, directory) for job in todo]))
+    try:
+        for path in results:
+            rendered.append(path)
+            report(f"[{len(rendered)}/{len(todo)}] {path} ({time.perf_counter() - start:.1f} s)")
+    finally:
+        if workers != 1:
+            pool.shutdown(cancel_futures=True)
+    return rendered
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render all combinations of a sweep spec.")
+    parser.add_argument("spec", help="json file with the sweep spec")
+    parser.add_argument("--out", default="renders", help="directory of the images")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, default one per cpu")
+    parser.add_argument("--force", action="store_true", help="also render existing images")
+    args = parser.parse_args(argv)
+
+    with open(args.spec) as infile:
+        spec = json.load(infile)
+    run(expand_spec(spec), args.out, args.workers, args.force)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
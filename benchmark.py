@@ -0,0 +1,160 @@
+""" Benchmark runner for the fractal pipeline.
+
+    Times ChaosGame.iterate for several n and step counts, fern_maker, every
+    method in variations.collection, the color computation and png export,
+    and records points per second and peak traced memory of every case.
+
+    Usage
+    -----
+    python benchmark.py                    run and compare with the baseline
+    python benchmark.py --save-baseline    run and store the results as baseline
+    python benchmark.py --quick            small sizes, for a fast sanity check
+
+    The baseline is machine specific, so it is not kept under version control;
+    store one on the machine the comparisons are made on.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+import chaos_game
+import fern
+import variations
+
+#: default file the baseline results are stored in
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+
+def measure(func, points, repeat=3):
+    """ Time func and trace its peak memory.
+
+        Parameters
+        ----------
+        func: function without arguments running the case once
+        points: int, number of points the case handles
+        repeat: int, the fastest of repeat runs is reported
+
+        Returns
+        -------
+        Dictionary with seconds, points_per_second and peak_bytes.
+    """
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    best = min(seconds)
+    return {"seconds": best, "points_per_second": points / best if best else float("inf"),
+            "peak_bytes": peak}
+
+
+def cases(scale=1.0):
+    """ Yield (name, points, func) for every benchmark case.
+
+        Parameters
+        ----------
+        scale: float, factor applied to all point counts
+    """
+    size = lambda n: max(int(n * scale), 10)
+
+    for n in (3, 6):
+        for steps in (size(100_000), size(1_000_000)):
+            game = chaos_game.ChaosGame(n, 1/3, seed=0)
+            yield f"iterate n={n} steps={steps}", steps, lambda game=game, steps=steps: game.iterate(steps)
+
+    for steps in (size(100_000), size(1_000_000)):
+        yield f"fern_maker n={steps}", steps, lambda steps=steps: fern.fern_maker(steps, seed=0)
+
+    game = chaos_game.ChaosGame(6, 1/3, seed=0)
+    game.iterate(size(1_000_000))
+    points = len(game.X)
+    yield f"color n={points}", points, game._method_compute_color
+
+    x = np.ascontiguousarray(game.X[:, 0])
+    y = np.ascontiguousarray(game.X[:, 1])
+    transform = variations.variations(x, y)
+    for name, method in transform.collection.items():
+        yield f"variation {name} n={points}", points, method
+    coeff = {name: 1 / len(transform.collection) for name in transform.collection}
+    yield f"variation fused n={points}", points, lambda: transform(coeff)
+
+    with tempfile.TemporaryDirectory() as directory:
+        outfile = os.path.join(directory, "benchmark.png")
+        yield f"savepng n={points}", points, lambda: game.savepng(outfile, color=True, resolution=1024)
+
+
+def compare(results, baseline, tolerance=0.25):
+    """ Names of the cases whose points per second dropped by more than
+        tolerance relative to the baseline.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name in baseline:
+            reference = baseline[name]["points_per_second"]
+            if result["points_per_second"] < (1 - tolerance) * reference:
+                regressions.append(name)
+    return regressions
+
+
+def run(scale=1.0, repeat=3, report=print):
+    """ Run all cases and return a dictionary with the results by name."""
+    results = {}
+    for name, points, func in cases(scale):
+        results[name] = measure(func, points, repeat)
+        result = results[name]
+        report(f"{name:40s} {result['seconds']:9.4f} s {result['points_per_second']:14,.0f} points/s"
+               f" {result['peak_bytes'] / 2**20:9.1f} MiB")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--baseline", default=BASELINE, help="baseline json file")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as baseline")
+    parser.add_argument("--output", help="also write the results to this json file")
+    parser.add_argument("--quick", action="store_true", help="run with 1%% of the points")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case, the fastest counts")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative drop in points per second")
+    args = parser.parse_args(argv)
+
+    results = run(0.01 if args.quick else 1.0, args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as outfile:
+            json.dump(results, outfile, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as outfile:
+            json.dump(results, outfile, indent=2)
+        print(f"baseline stored in {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline in {args.baseline}; run with --save-baseline first")
+        return 0
+
+    with open(args.baseline) as infile:
+        baseline = json.load(infile)
+    regressions = compare(results, baseline, args.tolerance)
+    for name in regressions:
+        print(f"REGRESSION {name}: {results[name]['points_per_second']:,.0f} points/s,"
+              f" baseline {baseline[name]['points_per_second']:,.0f}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+""" Content-addressed on-disk cache of generated attractors.
+
+    Every entry is a store.PointStore directory named after a hash of
+    everything the points depend on: the generator type, its parameters,
+    the number of points, the discard, the seed and the cache version. A hit
+    skips the iteration and memory-maps the stored points. The points are
+    kept as float32 and the corners as uint8, which is compact while still
+    allowing zero-copy memory mapping. Entries are evicted least recently
+    used first when the cache grows above its size limit.
+"""
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+
+import chaos_game
+import fern
+from store import PointStore
+
+#: bump when a change to the generators changes their output for a given seed
+VERSION = 1
+
+#: default cache directory, overridden by the environment variable CHAOS_CACHE_DIR
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cache", "chaos_game")
+
+
+def cache_key(**params):
+    """ Hash of the json representation of the parameters and the cache version."""
+    params = dict(params, version=VERSION)
+    text = json.dumps(params, sort_keys=True, default=lambda value: np.asarray(value).tolist())
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+class AttractorCache:
+    """ Cache of generated attractors with a least recently used size limit.
+
+        Parameters
+        ----------
+        directory: string, where the entries are kept, default
+                   CHAOS_CACHE_DIR or DEFAULT_DIRECTORY
+        max_bytes: int, size limit of all entries together
+    """
+    def __init__(self, directory=None, max_bytes=2**30):
+        self.directory = directory or os.environ.get("CHAOS_CACHE_DIR", DEFAULT_DIRECTORY)
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _entries(self):
+        """ Paths of all complete entries."""
+        return [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                if "." not in name]
+
+    def size(self):
+        """ Total size of all entries in bytes."""
+        return sum(_size(path) for path in self._entries())
+
+    def evict(self, keep=None):
+        """ Remove least recently used entries until the size limit is met.
+
+            Parameters
+            ----------
+            keep: path of an entry that is never evicted
+        """
+        entries = sorted(self._entries(), key=lambda path: os.stat(os.path.join(path, "meta.json")).st_mtime)
+        total = sum(_size(path) for path in entries)
+        for path in entries:
+            if total <= self.max_bytes:
+                break
+            if path != keep:
+                total -= _size(path)
+                shutil.rmtree(path, ignore_errors=True)
+
+    def get(self, key, generate):
+        """ Return the PointStore of key, calling generate(path) to fill it on a miss.
+
+            generate must create a PointStore in the directory it is given.
+        """
+        path = os.path.join(self.directory, key)
+        if os.path.isdir(path):
+            os.utime(os.path.join(path, "meta.json"))  # mark as recently used
+            return PointStore(path)
+
+        partial = f"{path}.partial-{os.getpid()}"
+        shutil.rmtree(partial, ignore_errors=True)
+        try:
+            generate(partial)
+            os.replace(partial, path)
+        except OSError:
+            if not os.path.isdir(path):  # not filled by another process meanwhile
+                raise
+        finally:
+            shutil.rmtree(partial, ignore_errors=True)
+        self.evict(keep=path)
+        return PointStore(path)
+
+    def chaos_game(self, n, r, steps, discard=5, seed=0):
+        """ ChaosGame(n, r) iterated steps times, with X read from the cache."""
+        if seed is None:
+            raise ValueError("only seeded runs can be cached")
+        key = cache_key(generator="ChaosGame", n=n, r=r, steps=steps, discard=discard, seed=seed)
+        game = chaos_game.ChaosGame(n, r, seed)
+        game.load(self.get(key, lambda path: game.iterate(steps, discard, store=path)))
+        return game
+
+    def ifs(self, ifs, n, start=(0, 0), seed=0):
+        """ Points of ifs.iterate(n, start), read from the cache."""
+        if seed is None:
+            raise ValueError("only seeded runs can be cached")
+        key = cache_key(generator="IFS", matrices=ifs.matrices, offsets=ifs.offsets,
+                        cumulative=ifs.cumulative, n=n, start=start, seed=seed)
+        return self.get(key, lambda path: ifs.iterate(n, start, seed=seed, store=path)).points
+
+    def fern(self, n=100000, seed=0):
+        """ Points of fern.fern_maker(n), read from the cache."""
+        return self.ifs(fern.barnsley, n, seed=seed)
@@ -1,7 +1,15 @@
 import numpy as np
-import matplotlib.pyplot as plt
-import os
+import functools
 import time
+from engine import (affine_recurrence, color_recurrence, corner_dtype, markov_choices,
+                    palette_recurrence, ratio_recurrence)
+from parallel import run_walkers
+from profiling import instrument
+from rng import make_rng
+from store import PointStore
+from hutchinson import hutchinson
+from render import (DensityHistogram, png_filename, progressive, pyplot, rasterize,
+                    square_extent, write_png)
 
 class ChaosGame:
     """ Calculating fractal distributions of points based on n-gons and
@@ -12,14 +20,58 @@ class ChaosGame:
         n: int, size of n-gon (3 or above)
         r: float, ratio between previous point the corner decisive of next point
            default value: 0.5; range: (0, 1)
+        seed: int, numpy Generator or None, source of all random numbers
+        dtype: data type of the points of iterate and iterate_chunks; the
+               recurrence is always evaluated in float64, float32 halves the
+               memory of the points. The corners are stored as the smallest
+               unsigned integer type, see engine.corner_dtype
+        order: memory layout of the points; "C" stores every point as a row,
+               "F" stores all x and then all y values, so X[:, 0] and
+               X[:, 1] are contiguous arrays (structure of arrays)
+        start: "random" for a start point with random weights of the corners,
+               which needs a few discarded points to reach the attractor, or
+               "attractor" for a start point on the attractor, see
+               attractor_points, so that iterate can use discard=0
+        probabilities: optional array with the relative probability of
+                       choosing every corner, default uniform
+        ratios: optional array with a ratio per corner used instead of r
+        rotations: optional array with an angle in radians per corner; the
+                   map of corner c is x -> c + ratio*R(angle)(x - c), which
+                   for angle 0 is the usual ratio*x + (1-ratio)*c
+        rule: optional constraint on the next corner given the previous one;
+              a sequence of forbidden offsets, e.g. (0,) never chooses the
+              same corner twice and (1, -1) never a neighbour of the
+              previous corner, or a matrix of shape (n, n) with the relative
+              weight of corner j after corner i, which multiplies the
+              probabilities
+        palette: optional colors of the corners, RGB or RGBA values between
+                 0 and 1 or matplotlib color names; the color of a point
+                 then is 0.5*(color of the previous point + palette color of
+                 its corner), and color, render and savepng give RGB(A)
+                 images instead of colormapped ones
+
+        The general maps run through engine.affine_recurrence and the
+        constrained choices through engine.markov_choices, so they are as
+        vectorized as the plain game, which keeps its own faster path.
 
         Returns
         -------
         fig.png: the fractal figure
     """
-    def __init__(self, n=3, r=0.5):
+    def __init__(self, n=3, r=0.5, seed=None, dtype=np.float64, order="C", start="random",
+                 probabilities=None, ratios=None, rotations=None, rule=None, palette=None):
         self.n = n
         self.r = r
+        self.rng = make_rng(seed)
+        self.dtype = np.dtype(dtype)
+        self.order = order
+        self.start = start
+
+        if order not in ("C", "F"):
+            raise ValueError(f"order must be 'C' or 'F'; order is {order}")
+
+        if start not in ("random", "attractor"):
+            raise ValueError(f"start must be 'random' or 'attractor'; start is {start}")
 
         if r < 0 or 1 < r:
             raise ValueError(f"r must be between 0 and 1; r is {r}")
@@ -31,67 +83,494 @@ class ChaosGame:
             raise TypeError(f"n must be of type integer; n is {type(n)}")
 
         self._generate_ngon()
+        self._generate_maps(probabilities, ratios, rotations, rule)
+        self._set_palette(palette)
         self._starting_point()
 
 
     def _generate_ngon(self):
-        """ Generate array with the n-gon corner points."""
+        """ Generate array with the n-gon corner points, shared by all games with this n."""
+        self._corners = ngon_corners(self.n)
+
+
+    def _generate_maps(self, probabilities, ratios, rotations, rule):
+        """ Set up the tables of generalized games.
+
+        _cumulative holds the cumulative corner probabilities and
+        _transitions the cumulative probabilities per previous corner, both
+        None for uniform choices; _matrices and _offsets hold the affine
+        maps, None for the plain maps r*x + (1-r)*corner.
+        """
         n = self.n
-        self._corners = np.array([[np.sin(i*2*np.pi/(n)), np.cos(i*2*np.pi/(n))] for i in range(n)])
+        self._options = {"probabilities": probabilities, "ratios": ratios,
+                         "rotations": rotations, "rule": rule}
+        self._cumulative = self._transitions = self._matrices = self._offsets = None
+
+        if probabilities is not None or rule is not None:
+            weights = np.ones(n) if probabilities is None else np.asarray(probabilities, dtype=float)
+            if weights.shape != (n,) or np.any(weights < 0) or weights.sum() <= 0:
+                raise ValueError("probabilities must be n non-negative values with a positive sum")
+            self._cumulative = np.cumsum(weights / weights.sum())
+            self._cumulative[-1] = 1
+
+            if rule is not None:
+                if np.ndim(rule) == 2:
+                    table = np.asarray(rule, dtype=float)
+                    if table.shape != (n, n) or np.any(table < 0):
+                        raise ValueError("a rule matrix must have shape (n, n) and non-negative weights")
+                else:
+                    table = np.ones((n, n))
+                    for offset in rule:
+                        table[np.arange(n), (np.arange(n) + offset) % n] = 0
+                table = table * weights
+                totals = table.sum(axis=1, keepdims=True)
+                if np.any(totals <= 0):
+                    raise ValueError("the rule leaves no corner to choose after some corner")
+                self._transitions = np.cumsum(table / totals, axis=1)
+                self._transitions[:, -1] = 1
+
+        if ratios is not None or rotations is not None:
+            ratios = np.full(n, float(self.r)) if ratios is None else np.asarray(ratios, dtype=float)
+            angles = np.zeros(n) if rotations is None else np.asarray(rotations, dtype=float)
+            if ratios.shape != (n,) or angles.shape != (n,):
+                raise ValueError("ratios and rotations must have one value per corner")
+            if np.any(ratios < 0) or np.any(ratios > 1):
+                raise ValueError(f"ratios must be between 0 and 1; ratios are {ratios}")
+            cos, sin = np.cos(angles), np.sin(angles)
+            self._matrices = ratios[:, None, None] * np.stack((np.stack((cos, -sin), -1),
+                                                               np.stack((sin, cos), -1)), -2)
+            self._offsets = self._corners - np.einsum("kij,kj->ki", self._matrices, self._corners)
+
+        if self.start == "attractor" and self._transitions is not None:
+            raise ValueError("start='attractor' needs corner choices without a rule")
+
+
+    def _set_palette(self, palette):
+        """ Store the palette as a float matrix of shape (n, 3) or (n, 4), or None."""
+        if palette is not None:
+            if any(isinstance(color, str) for color in palette):
+                from matplotlib.colors import to_rgba
+                palette = [to_rgba(color) for color in palette]
+            palette = np.asarray(palette, dtype=float)
+            if palette.shape not in ((self.n, 3), (self.n, 4)):
+                raise ValueError("palette must have an RGB or RGBA color per corner")
+            if np.any(palette < 0) or np.any(palette > 1):
+                raise ValueError("palette values must be between 0 and 1")
+        self.palette = palette
+        self._options["palette"] = palette
+
+
+    def _color_recurrence(self, corners, previous=None):
+        """ Color values, or palette colors if there is a palette, of the points with corners."""
+        if self.palette is None:
+            return color_recurrence(corners, previous)
+        return palette_recurrence(corners, self.palette, previous)
+
+
+    def _channels(self, color):
+        """ The color argument of DensityHistogram for color values or palette colors."""
+        return self.palette.shape[1] if color and self.palette is not None else color
+
+
+    def _choose(self, size, previous=None, rng=None):
+        """ Draw the corners of the next size steps.
+
+        previous is the corner chosen before, needed by a rule; without it
+        the first corner is drawn from the probabilities.
+        """
+        rng = self.rng if rng is None else rng
+        if self._cumulative is None:
+            return rng.integers(self.n, size=size)
+        uniforms = rng.random(size)
+        if self._transitions is None or size == 0:
+            return np.searchsorted(self._cumulative, uniforms, side="right")
+
+        if previous is None:
+            previous = min(np.searchsorted(self._cumulative, uniforms[0], side="right"), self.n - 1)
+            return np.concatenate(([previous], markov_choices(self._transitions, uniforms[1:], previous)))
+        return markov_choices(self._transitions, uniforms, previous)
+
+
+    def _advance(self, X, choices, carry):
+        """ Effectuate the maps of choices on X in place, see engine.ratio_recurrence."""
+        if self._matrices is None:
+            ratio_recurrence(X, self.r, self._corners, choices, carry)
+        else:
+            affine_recurrence(X, self._matrices, self._offsets, choices, carry=carry)
 
 
     def _starting_point(self):
         """ Randomely select a start point."""
-        weight = np.random.random(self.n)
+        if self.start == "attractor":
+            if self._cumulative is None and self._matrices is None:
+                self.start_value = attractor_points(self.n, self.r, 1, self.rng)[0]
+                return
+            # every corner is the fixed point of its map; push one through random maps
+            point = np.array(self._corners[self._choose(1)[0]], dtype=float)
+            X = np.empty((33, 2))
+            X[0] = point
+            self._advance(X, self._choose(32), None)
+            self.start_value = X[-1]
+            return
+
+        weight = self.rng.random(self.n)
         weight = weight/np.sum(weight)
 
-        weighted_corners = np.array([self._corners[i] * weight[i] for i in range(self.n)])
-        self.start_value = np.sum(weighted_corners, axis=0) # sum the linear combinations
+        # sum the linear combinations
+        self.start_value = np.sum(self._corners * weight[:, None], axis=0)
+
+
+    def starting_points(self, size):
+        """ Draw size start points uniformly distributed in the n-gon.
 
+        See sample_ngon; the points are drawn from the generator of the game.
 
-    def iterate(self, steps, discard=5):
+        Returns
+        -------
+        matrix of shape (size, 2) with the points
+        """
+        return sample_ngon(self.n, size, self.rng)
+
+
+    @instrument("ChaosGame.iterate", points=lambda self, steps, *args, **kwargs: steps)
+    def iterate(self, steps, discard=5, workers=1, seed=None, store=None, extend=False):
         """ Effectuate the fractal algorithm.
 
         Parameters
         ----------
         steps: int, number of iteration steps
-        discard: int, the first iterative values that are to be deleted
+        discard: int, the first iterative values that are to be deleted;
+                 0 is fine with start="attractor"
+        workers: int, number of independent walkers run in a process pool;
+                 each walker starts from its own random point and discards
+                 its own first values
+        seed: int or numpy Generator; if given, replaces the generator of
+              the instance and redraws the start point before
+              iterating, so the run only depends on the seed
+        store: string or None, directory of a store.PointStore the points
+               are written to chunk by chunk as float32 instead of being
+               kept in memory; X then is a memory-mapped view of the store
+        extend: Boolean, if True; append steps more points to the previous
+                in-memory run (or restored checkpoint), continuing from its
+                last point and generator state. Nothing is discarded and
+                the points are identical to those of one longer run
 
         Attributes
         -------
         X: matrix, with generated fractal points
         _random_corners: array, store corners in iterative order
+
+        All corners are drawn in one call and the recurrence is evaluated in
+        blocks by engine.ratio_recurrence; for a given seed the points are
+        bit-identical to stepping one point at a time. Walkers draw from
+        independent streams spawned from the generator of the instance.
         """
-        r = self.r
-        X = np.empty((steps, 2))
+        if extend:
+            if workers > 1 or store is not None:
+                raise ValueError("only single walker in-memory runs can be extended")
+            self._extend(steps)
+            return
+
+        self._color = None
+        self._buffer = None
+        if seed is not None:
+            self.rng = make_rng(seed)
+            self._starting_point()
+
+        if store is not None:
+            if workers > 1:
+                raise ValueError("a store can only be filled by a single walker")
+            self._iterate_store(store, steps, discard)
+            return
+
+        if workers > 1:
+            X, self._random_corners = run_walkers(
+                _walk, steps - discard, [((2,), self.dtype), ((), corner_dtype(self.n))],
+                workers, self.rng, n=self.n, r=self.r, discard=discard, dtype=self.dtype,
+                start=self.start, options=self._options)
+            self.X = np.asarray(X, order=self.order)
+            return
+
+        X = np.empty((steps, 2), dtype=self.dtype, order=self.order)
         X[0] = self.start_value
-        _random_corners = np.zeros(steps)
+        _random_corners = np.zeros(steps, dtype=corner_dtype(self.n))
 
-        for i in range(steps-1):
-            c = np.random.randint(self.n)
-            X[i+1] = r * X[i] + (1-r) * self._corners[c]
-            _random_corners[i+1] = c
+        corners = self._choose(max(steps-1, 0))
+        carry = np.array(self.start_value, dtype=float)
+        self._advance(X, corners, carry)
+        _random_corners[1:] = corners
+        self._previous = int(corners[-1]) if len(corners) else None
 
-        self._random_corners = np.delete(_random_corners, (0, discard), axis=0)
-        self.X = np.delete(X, (0, discard), axis=0)
+        self._buffer, self._corner_buffer, self._carry = X, _random_corners, carry
+        self._offset, self._length = min(discard, steps), steps
+        self._random_corners = _random_corners[discard:]
+        self.X = X[discard:]
 
 
-    def _method_compute_color(self):
-        """ Make a list of values for coding color based on color of previous point and corner vicinity """
-        _color_value = []
-        _color_value.append(self._random_corners[0])
+    def _extend(self, steps):
+        """ Append steps points to the run in the growable buffers.
+
+        The buffers grow at least geometrically, so appending many times
+        copies every point only a constant number of times on average.
+        """
+        if getattr(self, "_buffer", None) is None:
+            raise ValueError("there is no in-memory run to extend; call iterate first")
+
+        length = self._length
+        needed = length + steps
+        if needed > len(self._buffer):
+            capacity = max(needed, 2 * len(self._buffer))
+            buffer = np.empty((capacity, 2), dtype=self._buffer.dtype, order=self.order)
+            buffer[:length] = self._buffer[:length]
+            corner_buffer = np.zeros(capacity, dtype=self._corner_buffer.dtype)
+            corner_buffer[:length] = self._corner_buffer[:length]
+            self._buffer, self._corner_buffer = buffer, corner_buffer
+
+        corners = self._choose(steps, self._previous)
+        self._advance(self._buffer[length-1:needed], corners, self._carry)
+        self._corner_buffer[length:needed] = corners
+        if steps > 0:
+            self._previous = int(corners[-1])
+        self._length = needed
+
+        self.X = self._buffer[self._offset:needed]
+        self._random_corners = self._corner_buffer[self._offset:needed]
+        if getattr(self, "_color", None) is not None:
+            previous = self._color[-1] if len(self._color) else None
+            self._color = np.concatenate((self._color, self._color_recurrence(corners, previous)))
+
+
+    def get_state(self):
+        """ Checkpoint of the run: generator state, last point and corner.
+
+        A ChaosGame with the same n and r continues exactly where this run
+        stopped after set_state and iterate(steps, extend=True).
+        """
+        if getattr(self, "_buffer", None) is None or self._length == 0:
+            raise ValueError("there is no in-memory run to checkpoint; call iterate first")
+        return {"n": self.n, "r": self.r,
+                "rng": self.rng.bit_generator.state,
+                "point": self._carry.copy(),
+                "corner": int(self._corner_buffer[self._length-1])}
+
+
+    def set_state(self, state):
+        """ Restore a checkpoint of get_state; X is empty until the run is extended."""
+        if state["n"] != self.n or state["r"] != self.r:
+            raise ValueError("the checkpoint belongs to a ChaosGame with other n or r")
+        self.rng.bit_generator.state = state["rng"]
+        self._carry = np.array(state["point"], dtype=float)
+        self._buffer = np.array([self._carry], dtype=self.dtype, order=self.order)
+        self._corner_buffer = np.array([state["corner"]], dtype=corner_dtype(self.n))
+        self._previous = state["corner"]
+        self._offset, self._length = 1, 1
+        self.X = self._buffer[1:]
+        self._random_corners = self._corner_buffer[1:]
+        self._color = None
+
+
+    def _iterate_store(self, path, steps, discard, chunk_size=1_000_000):
+        """ Write all points into a new PointStore and view the kept ones."""
+        store = PointStore.create(path, steps, min(discard, steps), corners=self.n,
+                                  generator="ChaosGame", n=self.n, r=self.r)
+        position = 0
+        for points, corners in self.iterate_chunks(steps, 0, chunk_size, dtype=np.float32):
+            store.write(position, points, corners)
+            position += len(points)
+        store.flush()
+        self.load(store)
+
+
+    def load(self, store):
+        """ Use the points of a store.PointStore (or its directory) as X.
+
+        The loaded points replace any in-memory run, which can then no
+        longer be extended.
+        """
+        if not isinstance(store, PointStore):
+            store = PointStore(store)
+        self.store = store
+        self.X = store.points
+        self._random_corners = store.corners
+        self._color = None
+        self._buffer = None
 
-        for i in range(len(self.X)-1):
-            _color_value.append(0.5 * (_color_value[i] + self._random_corners[i+1]))
 
-        return _color_value
+    def iterate_chunks(self, steps, discard=5, chunk_size=1_000_000, color=False, dtype=None,
+                       order=None):
+        """ Effectuate the fractal algorithm chunk by chunk.
+
+        Generates the same points as iterate, but never holds more than
+        chunk_size of them in memory.
+
+        Parameters
+        ----------
+        steps: int, number of iteration steps
+        discard: int, the first iterative values that are to be deleted
+        chunk_size: int, maximal number of points per chunk
+        color: Boolean, if True; also yield the color values (or palette
+               colors) of the points, continued from chunk to chunk as in
+               the color property
+        dtype: data type of the points, default the dtype of the instance
+        order: memory layout of the points, default the order of the instance
+
+        Yields
+        ------
+        (points, corners): matrix with the next fractal points and array
+                           with their corners
+        (points, corners, colors): if color is True
+        """
+        dtype = self.dtype if dtype is None else dtype
+        order = self.order if order is None else order
+        carry, previous_corner = np.array(self.start_value, dtype=float), 0
+        previous_color = None
+        generated = 0
+        while generated < steps:
+            size = min(chunk_size, steps - generated)
+            draws = size - 1 if generated == 0 else size
+
+            X = np.empty((draws + 1, 2), dtype=dtype, order=order)
+            X[0] = carry
+            choices = self._choose(draws, None if generated == 0 else int(previous_corner))
+            self._advance(X, choices, carry)
+            corners = np.empty(draws + 1, dtype=corner_dtype(self.n))
+            corners[0] = previous_corner
+            corners[1:] = choices
+
+            if generated > 0:
+                X, corners = X[1:], corners[1:]
+            previous_corner = corners[-1]
+
+            skip = max(discard - generated, 0)
+            generated += size
+            if skip >= size:
+                continue
+            X, corners = X[skip:], corners[skip:]
+            if color:
+                colors = self._color_recurrence(corners, previous_color)
+                previous_color = colors[-1]
+                yield X, corners, colors
+            else:
+                yield X, corners
+
+
+    def _extent(self, margin=0.02):
+        """ Square (xmin, xmax, ymin, ymax) around the n-gon.
+
+        Rotated maps can leave the n-gon, so then the square also holds the
+        points of a short run drawn from its own fixed seed.
+        """
+        if self._matrices is None:
+            return square_extent(self._corners, margin)
+        X = np.empty((20_000, 2))
+        X[0] = self._corners[0]
+        self._advance(X, self._choose(len(X) - 1, rng=make_rng(0)), None)
+        return square_extent(np.concatenate((self._corners, X[100:])), margin)
+
+
+    @instrument("ChaosGame.render", points=lambda self, outfile, steps, *args, **kwargs: steps)
+    def render(self, outfile, steps, discard=5, color=False, cmap_name="jet",
+               resolution=1024, chunk_size=1_000_000, tolerance=None, preview=None):
+        """ Stream the fractal into a density histogram and save it as png.
+
+        The points are never stored, so memory only grows with resolution,
+        and they are generated as float32, which is plenty for binning.
+        With a tolerance the rendering stops as soon as the image has
+        converged, see render.progressive, and steps is only the maximum.
+
+        Parameters
+        ----------
+        outfile: string, name of figure file
+        steps: int, number of iteration steps
+        discard: int, the first iterative values that are to be deleted
+        color: Boolean, if True; color is the mean color value of the points
+               in each pixel, or the mean palette color with a palette.
+               Only the per pixel sums are kept, never a color per point.
+               If False; black is used
+        cmap_name: matplotlib colormap
+        resolution: int or (width, height), size of the image in pixels
+        chunk_size: int, number of points generated at a time
+        tolerance: float or None, stop when the normalized histogram changes
+                   less than this between checks
+        preview: function preview(histogram, points, change) called at every
+                 convergence check, e.g. to save intermediate images
+
+        Returns
+        -------
+        The DensityHistogram with the accumulated points.
+        """
+        filename = png_filename(outfile)
+        histogram = DensityHistogram(resolution, self._extent(), self._channels(color))
+        chunks = ((chunk[0], chunk[2] if color else None)
+                  for chunk in self.iterate_chunks(steps, discard, chunk_size, color, np.float32))
+
+        if tolerance is None and preview is None:
+            for points, colors in chunks:
+                histogram.add(points, colors)
+        else:
+            progressive(chunks, histogram, 0 if tolerance is None else tolerance, preview=preview)
+
+        histogram.savepng(filename, cmap_name, color_range=(0, self.n - 1))
+        return histogram
+
+
+    @instrument("ChaosGame.render_hutchinson")
+    def render_hutchinson(self, outfile, color=False, cmap_name="jet", resolution=1024,
+                          passes=24, subsamples=1):
+        """ Compute the density of the fractal on a raster with the Hutchinson
+        operator and save it as png.
+
+        No points are generated, so the image has no sampling noise and the
+        cost only depends on the resolution, see hutchinson.hutchinson.
+
+        Parameters
+        ----------
+        outfile: string, name of figure file
+        color: Boolean, if True; color is the mean color value of the density
+               in each pixel. If False; black is used
+        cmap_name: matplotlib colormap
+        resolution: int or (width, height), size of the image in pixels
+        passes: int, maximal number of applications of the operator
+        subsamples: int, refinement per pixel side of the raster the
+                    operator works on, more accurate at subsamples**2 times
+                    the cost
+
+        Returns
+        -------
+        The DensityHistogram with the density.
+        """
+        filename = png_filename(outfile)
+        if self._transitions is not None:
+            raise ValueError("the Hutchinson operator needs corner choices without a rule")
+        if self._matrices is None:
+            matrices = np.repeat([self.r * np.eye(2)], self.n, axis=0)
+            offsets = (1 - self.r) * self._corners
+        else:
+            matrices, offsets = self._matrices, self._offsets
+        probabilities = np.ones(self.n) if self._cumulative is None else np.diff(self._cumulative, prepend=0)
+        histogram = hutchinson(matrices, offsets, probabilities, resolution, self._extent(),
+                               passes, colors=np.arange(self.n) if color else None,
+                               subsamples=subsamples)
+        histogram.savepng(filename, cmap_name, color_range=(0, self.n - 1))
+        return histogram
+
+
+    @instrument("ChaosGame.color", points=lambda self: len(self._random_corners))
+    def _method_compute_color(self):
+        """ Make an array of values for coding color based on color of previous point and corner vicinity """
+        return self._color_recurrence(self._random_corners)
 
 
     @property
     def color(self):
-        return self._method_compute_color()
+        """ float32 array with the color values, or matrix with the RGB(A)
+        colors if there is a palette, cached until the next iterate."""
+        if getattr(self, "_color", None) is None:
+            self._color = self._method_compute_color()
+        return self._color
 
 
+    @instrument("ChaosGame.plot", points=lambda self, *args, **kwargs: len(self.X))
     def plot(self, color=False, cmap_name="jet"):
         """ Plot the fractal points.
 
@@ -103,10 +582,11 @@ class ChaosGame:
         The other parameters described in mehtod plot
         """
         if color:
-            colors = self._method_compute_color()
+            colors = self.color
         else:
             colors = "black"
 
+        plt = pyplot()
         plt.scatter(*zip(*self.X), c=colors, cmap=cmap_name, s=0.2, marker=".")
         plt.axis("equal")
         plt.axis("off")
@@ -114,34 +594,120 @@ class ChaosGame:
 
     def show(self, color=False, cmap_name="jet"):
         self.plot(color, cmap_name)
-        plt.show()
+        pyplot().show()
 
 
-    def savepng(self, outfile, color=False, cmap_name="jet"):
+    @instrument("ChaosGame.savepng", points=lambda self, *args, **kwargs: len(self.X))
+    def savepng(self, outfile, color=False, cmap_name="jet", resolution=2048,
+                supersample=1, raster=True):
         """ Saves plot as png file only.
 
         Parameter
         ---------
         outfile: string, name of figure file
+        resolution: int or (width, height), size of the image in pixels
+        supersample: int, subpixels per pixel side used for antialiasing,
+                     e.g. 2; it costs supersample**2 times the memory
+        raster: Boolean, if True; the points are binned straight into a pixel
+                buffer. If False; the matplotlib scatter plot is saved
         The other parameters described in mehtod plot
 
         Raises
         ------
         NameError: If file name has extension other than .png
         """
-        name, ext = os.path.splitext(outfile)
+        filename = png_filename(outfile)
 
-        if ext == ".png":
-            filename = outfile
-        elif not ext:
-            filename = name + ".png"
-        else:
-            raise NameError ("Only accepted file extension is png")
+        if raster:
+            colors = self.color if color else None
+            image = rasterize(self.X, colors, resolution, self._extent(), cmap_name,
+                              (0, self.n - 1), supersample)
+            write_png(filename, image)
+            return
+
+        self.plot(color, cmap_name)
+        pyplot().savefig(filename, dpi=300, transparent=True)
 
-        self.plot(color, cmap_name="jet")
-        plt.savefig(filename, dpi=300, transparent=True)
 
 
+@functools.lru_cache(maxsize=None)
+def ngon_corners(n):
+    """ Read-only matrix of shape (n, 2) with the corners of the regular n-gon
+    on the unit circle, the first one at the top; computed once per n.
+    """
+    angles = np.arange(n) * 2 * np.pi / n
+    corners = np.column_stack((np.sin(angles), np.cos(angles)))
+    corners.setflags(write=False)
+    return corners
+
+
+def sample_ngon(n, size, rng=None):
+    """ Draw size points uniformly distributed in the regular n-gon.
+
+    The n-gon is a fan of n triangles of equal area between the center and
+    two neighbouring corners. Every point picks a triangle and barycentric
+    weights (u, v) uniform in the unit triangle, by reflecting the uniform
+    square onto it, so the points are u*corner[k] + v*corner[k+1].
+
+    Parameters
+    ----------
+    n: int, number of corners
+    size: int, number of points
+    rng: int, numpy Generator or None, see rng.make_rng
+
+    Returns
+    -------
+    matrix of shape (size, 2) with the points
+    """
+    rng = make_rng(rng)
+    corners = ngon_corners(n)
+    triangle = rng.integers(n, size=size)
+    u, v = rng.random((2, size))
+    outside = u + v > 1
+    u[outside], v[outside] = 1 - u[outside], 1 - v[outside]
+    return u[:, None] * corners[triangle] + v[:, None] * corners[(triangle + 1) % n]
+
+
+def attractor_points(n, r, size, rng=None, depth=32):
+    """ Draw size points lying on the attractor of the n-gon chaos game.
+
+    Every corner is the fixed point of its own map x -> r*x + (1-r)*corner,
+    so it lies on the attractor, and so do all its images under the maps.
+    Every point starts in a random corner and is mapped by depth random
+    maps, all points side by side. The points are distributed like the
+    attractor itself down to a scale of r**depth, so walkers started from
+    them need no burn-in and many short walkers do not pile up in the
+    corners. The result can serve as a reservoir of start points.
+
+    Parameters
+    ----------
+    n: int, number of corners
+    r: float, ratio of the chaos game
+    size: int, number of points
+    rng: int, numpy Generator or None, see rng.make_rng
+    depth: int, number of random maps applied to the corners
+
+    Returns
+    -------
+    matrix of shape (size, 2) with the points
+    """
+    rng = make_rng(rng)
+    scaled = (1 - r) * ngon_corners(n)
+    choices = rng.integers(n, size=(depth + 1, size))
+    points = ngon_corners(n)[choices[0]]
+    for choice in choices[1:]:
+        points *= r
+        points += scaled[choice]
+    return points
+
+
+def _walk(X, random_corners, rng, n, r, discard, dtype, start, options):
+    """ Walker of ChaosGame.iterate run in a worker process."""
+    game = ChaosGame(n, r, rng, dtype, start=start, **options)
+    game.iterate(len(X) + discard, discard)
+    X[:] = game.X
+    random_corners[:] = game._random_corners
+
 
 if __name__ == "__main__":
     N = 100_000
@@ -0,0 +1,371 @@
+""" Numerical kernels shared by the fractal generators.
+
+    The kernels work on whole blocks of pre-drawn random choices so that the
+    interpreter overhead is paid once per block instead of once per point.
+"""
+from bisect import bisect_right
+from itertools import accumulate
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+#: number of points handled per block of the recurrence
+BLOCK_SIZE = 1 << 16
+
+#: number of lanes per lane length in affine_recurrence
+LANE_RATIO = 16
+
+#: largest number of maps composed ahead into words by affine_recurrence
+WORD_MAPS = 4096
+
+#: largest number of choices markov_choices chains in lanes; its tables grow
+#: with the number of choices, so above this a step by step scan is faster
+MARKOV_LANES = 8
+
+
+def corner_dtype(n):
+    """ Smallest unsigned integer type holding the indices of n corners or maps."""
+    return np.uint8 if n <= 256 else np.uint16 if n <= 65536 else np.uint32
+
+
+def _ratio_recurrence_python(X, r, offsets):
+    """ Pure python evaluation of X[i+1] = r*X[i] + offsets[i].
+
+        Python floats are IEEE doubles, so the result is bit-identical to the
+        same recurrence evaluated with numpy float64 scalars. accumulate keeps
+        the loop itself in C; only the step function runs in the interpreter.
+    """
+    step = lambda previous, offset: r*previous + offset
+    for k in range(2):
+        values = accumulate(offsets[:, k].tolist(), step, initial=float(X[0, k]))
+        X[:, k] = np.fromiter(values, float, len(offsets) + 1)
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _ratio_recurrence_jit(X, r, offsets):
+        for i in range(offsets.shape[0]):
+            X[i+1, 0] = r*X[i, 0] + offsets[i, 0]
+            X[i+1, 1] = r*X[i, 1] + offsets[i, 1]
+else:
+    _ratio_recurrence_jit = None
+
+
+def ratio_recurrence(X, r, corners, choices, carry=None):
+    """ Effectuate X[i+1] = r*X[i] + (1-r)*corners[choices[i]] in place.
+
+        Parameters
+        ----------
+        X: matrix of shape (len(choices)+1, 2) with the start point in X[0]
+        r: float, ratio between previous point and selected corner
+        corners: matrix with the corner points
+        choices: integer array with the selected corner of every step
+        carry: optional float64 array of shape (2,) with X[0] in full
+               precision; it is used instead of X[0] and overwritten with
+               the last point, so runs of a float32 X can be continued
+               without rounding the state
+
+        The offsets (1-r)*corner are computed vectorized block by block and
+        the recurrence itself runs compiled when numba is available. The
+        recurrence is always evaluated in float64; if X has another dtype,
+        e.g. float32, every block is computed in a float64 buffer and then
+        rounded into X, so the result is the float64 result rounded.
+    """
+    r = float(r)
+    scaled = (1-r) * corners
+    work = None if X.dtype == np.float64 else np.empty((min(len(choices), BLOCK_SIZE) + 1, 2))
+    state = np.array(X[0] if carry is None else carry, dtype=float)
+    for start in range(0, len(choices), BLOCK_SIZE):
+        stop = min(start + BLOCK_SIZE, len(choices))
+        offsets = scaled[choices[start:stop]]
+        block = X[start:stop + 1] if work is None else work[:stop - start + 1]
+        block[0] = state
+        if _ratio_recurrence_jit is not None:
+            _ratio_recurrence_jit(block, r, offsets)
+        else:
+            _ratio_recurrence_python(block, r, offsets)
+        state = block[-1].copy()
+        if work is not None:
+            X[start + 1:stop + 1] = block[1:]
+    if carry is not None:
+        carry[:] = state
+    return X
+
+
+def color_recurrence(corners, previous=None, dtype=np.float32, block_size=64):
+    """ Color values c[i+1] = 0.5*(c[i] + corners[i+1]).
+
+        Parameters
+        ----------
+        corners: array with the corner of every point
+        previous: color value of the point before corners[0]; if None the
+                  first color value is corners[0]
+        dtype: data type of the returned color values
+        block_size: int, number of values per block of the scan
+
+        Returns
+        -------
+        Array with the color value of every point.
+
+        Within a block starting after the color p the recurrence unrolls to
+        c[j] = 0.5**(j+1) * (p + sum(2**m * corners[m] for m <= j)), a
+        cumulative sum with geometric weights computed for all blocks at
+        once. Only the carried color from block to block is sequential.
+    """
+    corners = np.asarray(corners, dtype=float)
+    n = len(corners)
+    if n == 0:
+        return np.empty(0, dtype=dtype)
+    if previous is None:
+        previous = corners[0]
+
+    blocks = -(-n // block_size)
+    padded = np.zeros(blocks * block_size)
+    padded[:n] = corners
+    padded = padded.reshape(blocks, block_size)
+
+    scale = 0.5 ** np.arange(1, block_size + 1)
+    local = np.cumsum(padded / scale * 0.5, axis=1) * scale  # blocks started from color 0
+
+    # color before every block: p[b+1] = 0.5**block_size * p[b] + local[b, -1]
+    decay = 0.5 ** block_size
+    carried = accumulate(local[:-1, -1].tolist(), lambda p, end: decay*p + end,
+                         initial=float(previous))
+    carried = np.fromiter(carried, float, blocks)
+
+    colors = local + carried[:, None] * scale
+    return colors.reshape(-1)[:n].astype(dtype)
+
+
+def palette_recurrence(corners, palette, previous=None, dtype=np.float32, block_size=64):
+    """ Multi-channel colors c[i+1] = 0.5*(c[i] + palette[corners[i+1]]).
+
+        Parameters
+        ----------
+        corners: integer array with the corner of every point
+        palette: matrix of shape (n, channels) with the color of every
+                 corner, e.g. RGB or RGBA values between 0 and 1
+        previous: color before corners[0]; if None the first color is
+                  palette[corners[0]]
+        dtype: data type of the returned colors
+        block_size: int, number of values per block of the scan
+
+        Returns
+        -------
+        Matrix of shape (len(corners), channels) with the colors.
+
+        The recurrence is linear, so every channel is the scan of
+        color_recurrence applied to the palette values of the corners.
+    """
+    palette = np.asarray(palette, dtype=float)
+    values = palette[np.asarray(corners, dtype=np.intp)]
+    colors = np.empty(values.shape, dtype=dtype)
+    for channel in range(palette.shape[1]):
+        start = None if previous is None else previous[channel]
+        colors[:, channel] = color_recurrence(values[:, channel], start, dtype, block_size)
+    return colors
+
+
+def _compose(maps, previous):
+    """ Rows a, b, c, d, e, f of maps o previous, all given as such rows."""
+    a, b, c, d, e, f = maps
+    pa, pb, pc, pd, pe, pf = previous
+    return (a*pa + b*pc, a*pb + b*pd, c*pa + d*pc, c*pb + d*pd,
+            a*pe + b*pf + e, c*pe + d*pf + f)
+
+
+def _word_maps(table, length):
+    """ Rows of the composition of every word of length maps, word w
+        applying map (w // k**q) % k as its q-th map.
+    """
+    k = table.shape[1]
+    words = np.arange(k**length)
+    composed = (np.ones(len(words)), np.zeros(len(words)), np.zeros(len(words)),
+                np.ones(len(words)), np.zeros(len(words)), np.zeros(len(words)))
+    for q in range(length):
+        composed = _compose(table[:, words // k**q % k], composed)
+    return np.array(composed)
+
+
+def affine_recurrence(X, matrices, offsets, choices, block_size=1 << 16, carry=None):
+    """ Effectuate X[i+1] = matrices[c] @ X[i] + offsets[c], c = choices[i], in place.
+
+        Parameters
+        ----------
+        X: matrix of shape (len(choices)+1, 2) with the start point in X[0]
+        matrices: array of shape (k, 2, 2) with the linear part of every map
+        offsets: array of shape (k, 2) with the constant part of every map
+        choices: integer array with the selected map of every step
+        block_size: int, number of steps handled at a time
+        carry: optional float64 array of shape (2,) with X[0] in full
+               precision, overwritten with the last point, see
+               ratio_recurrence
+
+        Every block is cut into M lanes of L consecutive steps. First the L
+        maps of all lanes are composed side by side, then the composed maps
+        carry the start point from lane to lane, and finally all lanes are
+        replayed side by side from their start points. This takes about 2*L
+        vectorized steps over M lanes plus M scalar steps instead of M*L
+        scalar steps. The composition takes p maps at a time from a table of
+        all k**p words of p maps, with k**p at most WORD_MAPS, so it only
+        costs L/p steps. The points are computed in float64 and rounded into
+        X when X has another dtype.
+    """
+    # rows a, b, c, d, e, f of the maps (a b; c d) x + (e f)
+    table = np.concatenate([np.reshape(matrices, (-1, 4)), offsets], axis=1).T.copy()
+    k = table.shape[1]
+    p = 1
+    while k**(p+1) <= WORD_MAPS:
+        p += 1
+    words = _word_maps(table, p)
+    x, y = (X[0] if carry is None else carry).tolist()
+
+    for start in range(0, len(choices), block_size):
+        stop = min(start + block_size, len(choices))
+        steps = stop - start
+        L = max(int(np.sqrt(steps / LANE_RATIO)) // p, 1) * p
+        M = -(-steps // L)
+        lanes = np.zeros(M*L, dtype=np.intp)  # padded steps are computed and dropped
+        lanes[:steps] = choices[start:stop]
+        lanes = np.ascontiguousarray(lanes.reshape(M, L).T)  # step in lane, lane
+
+        # composition of the maps of every lane by words of p maps
+        word = lanes[p-1::p].copy()
+        for q in range(p-2, -1, -1):
+            word *= k
+            word += lanes[q::p]
+        word_maps = np.take(words, word, axis=1)  # component, word in lane, lane
+        composed = (np.ones(M), np.zeros(M), np.zeros(M), np.ones(M), np.zeros(M), np.zeros(M))
+        for t in range(L // p):
+            composed = _compose(word_maps[:, t], composed)
+
+        # start point of every lane, carried in float64 from the previous block
+        x0, y0 = np.empty(M), np.empty(M)
+        for j, (aj, bj, cj, dj, ej, fj) in enumerate(zip(*(v.tolist() for v in composed))):
+            x0[j], y0[j] = x, y
+            x, y = aj*x + bj*y + ej, cj*x + dj*y + fj
+
+        # replay all lanes side by side
+        maps = np.take(table, lanes, axis=1)  # component, step in lane, lane
+        out = np.empty((L, 2, M))
+        x, y = x0, y0
+        for t in range(L):
+            ak, bk, ck, dk, ek, fk = maps[:, t]
+            x, y = ak*x + bk*y + ek, ck*x + dk*y + fk
+            out[t, 0] = x
+            out[t, 1] = y
+        X[start+1:stop+1] = out.transpose(2, 0, 1).reshape(-1, 2)[:steps]
+        x, y = out[(steps - 1) % L, :, (steps - 1) // L].tolist()
+    if carry is not None:
+        carry[:] = x, y
+    return X
+
+
+def _markov_scan_python(cumulative, uniforms, previous, choices):
+    """ Pure python scan of the choices of markov_choices into choices.
+
+        Returns the last choice. bisect_right on the rows as lists gives the
+        same index as searchsorted with side="right".
+    """
+    rows = cumulative.tolist()
+    last = len(rows) - 1
+    step = lambda state, uniform: min(bisect_right(rows[state], uniform), last)
+    values = accumulate(uniforms.tolist(), step, initial=previous)
+    next(values)
+    choices[:] = np.fromiter(values, np.intp, len(uniforms))
+    return int(choices[-1]) if len(choices) else previous
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _markov_scan_jit(cumulative, uniforms, previous, choices):
+        n = cumulative.shape[1]
+        state = previous
+        for i in range(uniforms.shape[0]):
+            low, high = 0, n
+            while low < high:
+                middle = (low + high) // 2
+                if cumulative[state, middle] <= uniforms[i]:
+                    low = middle + 1
+                else:
+                    high = middle
+            state = min(low, n - 1)
+            choices[i] = state
+        return state
+else:
+    _markov_scan_jit = None
+
+
+def markov_choices(cumulative, uniforms, previous, block_size=1 << 18):
+    """ Choices of a Markov chain, c[i] = searchsorted(cumulative[c[i-1]], uniforms[i]).
+
+        Parameters
+        ----------
+        cumulative: matrix of shape (n, n), row p with the cumulative
+                    probabilities of the next choice after choice p
+        uniforms: array with one uniform random number per choice
+        previous: int, the choice before the first one
+        block_size: int, number of choices handled at a time
+
+        Returns
+        -------
+        Integer array with the choices.
+
+        The scan runs compiled when numba is available. Otherwise, for up
+        to MARKOV_LANES choices, every step is a map from the previous
+        choice to the next one, a table of n entries computed for all steps
+        at once. The tables are then chained with the lanes of
+        affine_recurrence: the maps of M lanes of L steps are composed side
+        by side, the lanes are linked by M scalar steps and replayed side by
+        side from their first choice. The blocks shrink with n, so the
+        tables take as much memory as the uniforms of a full block. With
+        more choices the tables cost more than they save and the choices are
+        scanned step by step with bisect.
+    """
+    cumulative = np.ascontiguousarray(cumulative, dtype=float)
+    uniforms = np.ascontiguousarray(uniforms, dtype=float)
+    n = len(cumulative)
+    choices = np.empty(len(uniforms), dtype=np.intp)
+    state = int(previous)
+
+    if _markov_scan_jit is not None or n > MARKOV_LANES:
+        scan = _markov_scan_python if _markov_scan_jit is None else _markov_scan_jit
+        for start in range(0, len(uniforms), block_size):
+            stop = min(start + block_size, len(uniforms))
+            state = scan(cumulative, uniforms[start:stop], state, choices[start:stop])
+        return choices
+
+    block_size = max(block_size // n, 1)
+    for start in range(0, len(uniforms), block_size):
+        stop = min(start + block_size, len(uniforms))
+        steps = stop - start
+        L = max(int(np.sqrt(steps / LANE_RATIO)), 1)
+        M = -(-steps // L)
+        maps = np.empty((M*L, n), dtype=np.intp)
+        maps[steps:] = np.arange(n)  # padded steps keep the choice
+        for p in range(n):
+            maps[:steps, p] = np.searchsorted(cumulative[p], uniforms[start:stop], side="right")
+        np.minimum(maps, n - 1, out=maps)  # guards against rounding in the last entry
+        maps = maps.reshape(M, L, n)
+
+        # choice after every lane for every choice before it
+        composed = np.broadcast_to(np.arange(n), (M, n))
+        for t in range(L):
+            composed = np.take_along_axis(maps[:, t], composed, axis=1)
+
+        firsts = np.empty(M, dtype=np.intp)
+        for m, row in enumerate(composed.tolist()):
+            firsts[m] = state
+            state = row[state]
+
+        out = np.empty((L, M), dtype=np.intp)
+        lane = np.arange(M)
+        current = firsts
+        for t in range(L):
+            current = maps[lane, t, current]
+            out[t] = current
+        choices[start:stop] = out.T.reshape(-1)[:steps]
+    return choices
@@ -1,6 +1,12 @@
 import numpy as np
-import matplotlib.pyplot as plt
 import random
+from engine import affine_recurrence, corner_dtype
+from hutchinson import hutchinson
+from parallel import run_walkers
+from profiling import instrument
+from rng import make_rng
+from render import square_extent
+from store import PointStore
 
 class AffineTransform():
     """ Defines a general two dimensional affine transformation on the form A(x)+y.
@@ -48,6 +54,183 @@ class AffineTransform():
         return np.matmul(self.matrix, input)+self.constant
 
 
+class IFS():
+    """ Iterated function system of affine transformations, where every next
+        point is the image of the previous point under a transformation
+        chosen at random with given probabilities.
+
+        All transformations are stored stacked, the choices are drawn in bulk
+        and the points are generated block by block by
+        engine.affine_recurrence.
+
+    """
+
+    def __init__(self, transforms, probabilities, seed=None):
+        """ initializes the class
+
+            Parameters
+            ----------
+
+            transforms: List of AffineTransform instances.
+            probabilities: The probability of choosing every transformation.
+            seed: Int, numpy Generator or None, source of all random numbers.
+
+            Returns
+            -------
+            Nothing.
+
+        """
+        probabilities = np.asarray(probabilities, dtype=float)
+        if len(probabilities) != len(transforms):
+            raise ValueError("there must be one probability per transformation")
+        if np.any(probabilities < 0) or probabilities.sum() <= 0:
+            raise ValueError("probabilities must be non-negative with a positive sum")
+
+        self.matrices = np.array([t.matrix for t in transforms], dtype=float)
+        self.offsets = np.array([t.constant for t in transforms], dtype=float)
+        self.cumulative = np.cumsum(probabilities / probabilities.sum())
+        self.cumulative[-1] = 1
+        self.rng = make_rng(seed)
+
+    def choose(self, size):
+        """ Draws the indices of size randomly chosen transformations.
+
+            For a few transformations, counting the cumulative probabilities
+            each random number reaches gives the indices of np.searchsorted
+            several times faster.
+        """
+        uniforms = self.rng.random(size)
+        if len(self.cumulative) > 16:
+            return np.searchsorted(self.cumulative, uniforms, side="right")
+        choices = np.zeros(size, dtype=corner_dtype(len(self.cumulative)))
+        for bound in self.cumulative[:-1]:
+            choices += uniforms >= bound
+        return choices
+
+    def iterate_chunks(self, n, start=(0, 0), chunk_size=1_000_000, dtype=np.float64, order="C"):
+        """ Generates the same n points as iterate, chunk by chunk.
+
+            Parameters
+            ----------
+
+            n: The amount of points you want to generate.
+            start: The first point.
+            chunk_size: The maximal amount of points per chunk.
+            dtype: Data type of the points; the points are always computed
+                   in float64 and rounded, float32 halves their memory.
+            order: Memory layout of the points, "C" for rows of x and y or
+                   "F" for contiguous x and y columns.
+
+            Returns
+            -------
+            Generator of arrays of shape (chunk, 2) with the points.
+
+        """
+        carry = np.array(start, dtype=float)
+        for position in range(0, n, chunk_size):
+            size = min(chunk_size, n - position)
+            draws = size - 1 if position == 0 else size
+            points = np.empty((draws + 1, 2), dtype=dtype, order=order)
+            points[0] = carry
+            affine_recurrence(points, self.matrices, self.offsets, self.choose(draws), carry=carry)
+            if position > 0:
+                points = points[1:]
+            yield points
+
+    @instrument("IFS.iterate", points=lambda self, n, *args, **kwargs: n)
+    def iterate(self, n, start=(0, 0), workers=1, seed=None, store=None, dtype=np.float64,
+                order="C"):
+        """ Generates n points of the attractor.
+
+            Parameters
+            ----------
+
+            n: The amount of points you want to generate.
+            start: The first point.
+            workers: Number of independent walkers run in a process pool,
+                     all beginning in start.
+            seed: Int or numpy Generator; if given, replaces the generator
+                  of the instance before iterating.
+            store: Directory of a store.PointStore the points are written
+                   to chunk by chunk as float32 instead of kept in memory.
+            dtype: Data type of the points kept in memory, see iterate_chunks.
+            order: Memory layout of the points kept in memory, see iterate_chunks.
+
+            Returns
+            -------
+            Array of shape (n, 2) with the points, memory-mapped if store
+            is given.
+
+        """
+        if seed is not None:
+            self.rng = make_rng(seed)
+
+        if store is not None:
+            if workers > 1:
+                raise ValueError("a store can only be filled by a single walker")
+            points = PointStore.create(store, n, generator="IFS")
+            position = 0
+            for chunk in self.iterate_chunks(n, start, dtype=np.float32):
+                points.write(position, chunk)
+                position += len(chunk)
+            points.flush()
+            return points.points
+
+        if workers > 1:
+            points, = run_walkers(_walk, n, [((2,), dtype)], workers, self.rng,
+                                  ifs=self, start=start)
+            return np.asarray(points, order=order)
+
+        points = np.zeros((n, 2), dtype=dtype, order=order)
+        if n > 0:
+            points[0] = start
+            affine_recurrence(points, self.matrices, self.offsets, self.choose(n-1))
+        return points
+
+    def _extent(self, steps=100_000, margin=0.02):
+        """ Square (xmin, xmax, ymin, ymax) around the points of a short run
+            drawn from its own fixed seed, so it does not depend on the
+            generator of the instance.
+        """
+        points = np.zeros((steps, 2))
+        choices = np.searchsorted(self.cumulative, make_rng(0).random(len(points) - 1),
+                                  side="right")
+        affine_recurrence(points, self.matrices, self.offsets, choices)
+        return square_extent(points[100:], margin)
+
+
+    @instrument("IFS.render_hutchinson")
+    def render_hutchinson(self, outfile, solid="green", resolution=1024, extent=None,
+                          passes=48, subsamples=1):
+        """ Computes the density of the attractor on a raster with the
+            Hutchinson operator and saves it as png.
+
+            Parameters
+            ----------
+
+            outfile: Name of the png file.
+            solid: Matplotlib color of the attractor.
+            resolution: Int or (width, height), size of the image in pixels.
+            extent: (xmin, xmax, ymin, ymax) of the image; by default a square
+                    around the points of a short run with a fixed seed.
+            passes: Maximal number of applications of the operator.
+            subsamples: Refinement per pixel side of the raster the operator
+                        works on, more accurate at subsamples**2 times the cost.
+
+            Returns
+            -------
+            The DensityHistogram with the density.
+
+        """
+        if extent is None:
+            extent = self._extent()
+
+        histogram = hutchinson(self.matrices, self.offsets, np.diff(self.cumulative, prepend=0),
+                               resolution, extent, passes, subsamples=subsamples)
+        histogram.savepng(outfile, solid=solid)
+        return histogram
+
+
 """ Creates four instances of AffineTransform in order to generate the fern.
     The functions list contains the functions while fp_cumulative contains the
     corresponding cumulative probabilites needed to generate the fern
@@ -61,46 +244,59 @@ f4 = AffineTransform(-0.15,0.28,0.26,0.24,0,0.44)
 
 functions = [f1, f2, f3, f4]
 fp_cumulative = [0.01,0.86,0.93,1]
+barnsley = IFS(functions, np.diff(fp_cumulative, prepend=0))
 
-def next_point(x):
+def next_point(x, rng=None):
     """ Generates the next point of the fern.
 
         Parameters
         ----------
 
         x: two dimensional input vector.
+        rng: numpy Generator to draw from, default the one of barnsley.
 
         Returns
         -------
         The next point in the fern.
 
     """
-    r = np.random.random()
+    r = (rng or barnsley.rng).random()
     for j, p in enumerate(fp_cumulative):
         if r < p:
             return (functions[j](x[0],x[1]))
 
-def fern_maker(n=100000):
+def fern_maker(n=100000, workers=1, seed=None, store=None, dtype=np.float64, order="C"):
     """ Function which generates the whole fern
 
         Parameters
         ----------
 
         n: The amount of points you want to generate.
+        workers: Number of independent walkers run in a process pool. Every
+                 walker starts in the origin, which lies on the fern.
+        seed: Int or numpy Generator making the fern reproducible.
+        store: Directory of a store.PointStore to write the points to.
+        dtype: Data type of the points, e.g. np.float32 for rendering.
+        order: "F" to get contiguous x and y columns, e.g. for variations.
 
         Returns
         -------
         All the points in the fern.
 
     """
-    fern = np.zeros((n,2))
-    for i in range(len(fern)-1):
-        fern[i+1]=next_point(fern[i])
-    return fern
+    return barnsley.iterate(n, workers=workers, seed=seed, store=store, dtype=dtype,
+                            order=order)
+
+
+def _walk(points, rng, ifs, start):
+    """ Walker of IFS.iterate run in a worker process."""
+    points[:] = ifs.iterate(len(points), start, seed=rng, dtype=points.dtype)
 
 
 if __name__=="__main__":
     #Genereates an example fern
+    from render import pyplot
+    plt = pyplot()
     fern = fern_maker()
     plt.figure("Fern",figsize=(9, 9))
     plt.scatter(fern[:,0],fern[:,1], c="green", s=0.1)
@@ -0,0 +1,74 @@
+""" Running independent walkers of a chaos game in a process pool.
+
+    The chaos game is ergodic, so several short walks from independent
+    starting points fill the same attractor as one long walk. Every walker
+    writes its points straight into its own slice of shared memory output
+    arrays, so no point data is pickled between the processes.
+"""
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from rng import make_rng, spawn
+
+
+def _run_walker(walk, specs, start, stop, rng, kwargs):
+    """ Attach to the shared output arrays and let walk fill rows start:stop."""
+    blocks = [shared_memory.SharedMemory(name=name) for name, shape, dtype in specs]
+    try:
+        arrays = [np.ndarray(shape, dtype, buffer=block.buf)[start:stop]
+                  for block, (name, shape, dtype) in zip(blocks, specs)]
+        walk(*arrays, rng=rng, **kwargs)
+        del arrays
+    finally:
+        for block in blocks:
+            block.close()
+
+
+def run_walkers(walk, length, fields, workers, rng=None, **kwargs):
+    """ Split length output rows between independent walkers in a process pool.
+
+        Parameters
+        ----------
+        walk: module level function walk(*arrays, rng, **kwargs) that fills
+              the given array slices; rng is the walker's own Generator
+        length: int, total number of output rows
+        fields: list of (trailing shape, dtype) for every output array
+        workers: int, number of walkers and processes
+        rng: Generator or seed the independent walker streams are spawned from
+        kwargs: passed on to walk
+
+        Returns
+        -------
+        List of arrays with length rows each, in the order of fields.
+
+        Walkers whose share of the rows is empty, when there are more
+        workers than rows, are not started.
+    """
+    if workers < 1:
+        raise ValueError(f"workers must be at least 1; workers is {workers}")
+
+    streams = spawn(make_rng(rng), workers)
+    bounds = np.linspace(0, length, workers+1).astype(int)
+    walkers = [k for k in range(workers) if bounds[k] < bounds[k+1]]
+
+    blocks, specs = [], []
+    try:
+        for shape, dtype in fields:
+            shape = (length,) + tuple(shape)
+            nbytes = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+            block = shared_memory.SharedMemory(create=True, size=nbytes)
+            blocks.append(block)
+            specs.append((block.name, shape, np.dtype(dtype).str))
+
+        with ProcessPoolExecutor(max(len(walkers), 1)) as pool:
+            jobs = [pool.submit(_run_walker, walk, specs, bounds[k], bounds[k+1], streams[k], kwargs)
+                    for k in walkers]
+            for job in jobs:
+                job.result()
+
+        return [np.ndarray(shape, dtype, buffer=block.buf).copy()
+                for block, (name, shape, dtype) in zip(blocks, specs)]
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
@@ -0,0 +1,323 @@
+""" Rendering of fractal point sets straight into pixel buffers.
+
+    Instead of keeping every point and drawing it as a matplotlib marker the
+    points are binned into a 2-D hit-count histogram, chunk by chunk, so the
+    memory needed only depends on the image resolution. The histogram is
+    turned into an image with log-density tone mapping and written as png.
+"""
+import functools
+import os
+import struct
+import sys
+import zlib
+import numpy as np
+from profiling import instrument
+
+#: number of points binned at a time, bounding the temporaries for memory-mapped input
+CHUNK_SIZE = 1 << 20
+
+#: number of source pixels downsample widens to integers at a time
+DOWNSAMPLE_BAND = 1 << 20
+
+
+def png_filename(outfile):
+    """ Return outfile with a .png extension.
+
+        Raises
+        ------
+        NameError: If file name has extension other than .png
+    """
+    name, ext = os.path.splitext(outfile)
+
+    if ext == ".png":
+        return outfile
+    elif not ext:
+        return name + ".png"
+    else:
+        raise NameError ("Only accepted file extension is png")
+
+
+def pyplot():
+    """ Import matplotlib.pyplot on first use and return it.
+
+        The compute modules only need matplotlib to plot, so they import it
+        through this function instead of at the top. Without a display
+        (Linux without DISPLAY or WAYLAND_DISPLAY) and without MPLBACKEND
+        the Agg backend is selected, so headless workers never probe for a
+        GUI toolkit.
+    """
+    if "matplotlib.pyplot" not in sys.modules:
+        import matplotlib
+        if (sys.platform.startswith("linux") and not os.environ.get("MPLBACKEND")
+                and not os.environ.get("DISPLAY") and not os.environ.get("WAYLAND_DISPLAY")):
+            matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+@functools.lru_cache(maxsize=None)
+def colormap_lut(cmap_name="jet", size=256):
+    """ Look-up table of shape (size, 3) with uint8 RGB values of a matplotlib colormap.
+
+        Only the colormap registry is imported, not pyplot, and the read-only
+        tables are cached, so rendering frames never loads a backend.
+    """
+    from matplotlib import colormaps
+    cmap = colormaps[cmap_name]
+    lut = (cmap(np.linspace(0, 1, size))[:, :3] * 255).round().astype(np.uint8)
+    lut.setflags(write=False)
+    return lut
+
+
+@instrument("write_png", points=lambda filename, image: np.shape(image)[0] * np.shape(image)[1])
+def write_png(filename, image):
+    """ Write an uint8 image of shape (height, width, channels) as png.
+
+        Parameters
+        ----------
+        filename: string, name of the png file
+        image: array with 1 (gray), 3 (RGB) or 4 (RGBA) channels
+    """
+    image = np.asarray(image, dtype=np.uint8)
+    if image.ndim == 2:
+        image = image[:, :, None]
+    height, width, channels = image.shape
+    color_type = {1: 0, 3: 2, 4: 6}[channels]
+
+    raw = np.zeros((height, 1 + width*channels), dtype=np.uint8)  # filter byte 0 per row
+    raw[:, 1:] = image.reshape(height, -1)
+
+    def chunk(tag, data):
+        return (struct.pack(">I", len(data)) + tag + data
+                + struct.pack(">I", zlib.crc32(tag + data) & 0xffffffff))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)
+    with open(filename, "wb") as outfile:
+        outfile.write(b"\x89PNG\r\n\x1a\n")
+        outfile.write(chunk(b"IHDR", header))
+        outfile.write(chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)))
+        outfile.write(chunk(b"IEND", b""))
+
+
+class DensityHistogram:
+    """ Accumulates points into a hit-count histogram and an optional
+        color-sum histogram of fixed resolution.
+
+        Parameters
+        ----------
+        resolution: int or (width, height), size of the image in pixels
+        extent: (xmin, xmax, ymin, ymax) of the region mapped to the image
+        color: Boolean, if True; also accumulate the color value of the points.
+               An int above 1 accumulates that many color channels per
+               point, e.g. 3 for RGB or 4 for RGBA palette colors, into a
+               color_sum of shape (channels, pixels)
+    """
+    def __init__(self, resolution=1024, extent=(-1, 1, -1, 1), color=False):
+        if np.isscalar(resolution):
+            resolution = (resolution, resolution)
+        self.width, self.height = (int(size) for size in resolution)
+        self.extent = tuple(float(value) for value in extent)
+        self.counts = np.zeros(self.width * self.height, dtype=np.int64)
+        channels = int(color)
+        if channels > 1:
+            self.color_sum = np.zeros((channels, self.width * self.height))
+        else:
+            self.color_sum = np.zeros(self.width * self.height) if color else None
+
+    def _pixels(self, points):
+        """ Flat pixel index of every point inside the extent."""
+        xmin, xmax, ymin, ymax = self.extent
+        col = np.floor((points[:, 0] - xmin) * (self.width / (xmax - xmin)))
+        row = np.floor((ymax - points[:, 1]) * (self.height / (ymax - ymin)))
+        inside = (col >= 0) & (col < self.width) & (row >= 0) & (row < self.height)
+        return (row * self.width + col).astype(np.int64), inside
+
+    @instrument("DensityHistogram.add", points=lambda self, points, *args, **kwargs: len(points))
+    def add(self, points, colors=None):
+        """ Add a chunk of points of shape (N, 2) with optional color values,
+            of shape (N, channels) for a multi-channel histogram.
+        """
+        index, inside = self._pixels(points)
+        index = index[inside]
+        size = self.width * self.height
+        self.counts += np.bincount(index, minlength=size)
+        if self.color_sum is not None and self.color_sum.ndim == 2:
+            colors = np.asarray(colors)[inside]
+            for channel, color_sum in enumerate(self.color_sum):
+                color_sum += np.bincount(index, weights=colors[:, channel], minlength=size)
+        elif self.color_sum is not None:
+            self.color_sum += np.bincount(index, weights=np.asarray(colors)[inside], minlength=size)
+
+    def density(self):
+        """ Log tone mapped hit counts scaled to the range [0, 1]."""
+        counts = self.counts.reshape(self.height, self.width)
+        top = counts.max()
+        if top == 0:
+            return np.zeros(counts.shape)
+        return np.log1p(counts) / np.log1p(top)
+
+    def image(self, cmap_name="jet", color_range=None, solid="black"):
+        """ RGBA uint8 image of the histogram.
+
+            Pixels have the solid color, or are colored by the mean color
+            value through the colormap, with an opacity given by the log
+            density. Empty pixels are transparent. A multi-channel histogram
+            gives the mean RGB color of the pixel directly, and a fourth
+            channel scales the opacity.
+
+            Parameters
+            ----------
+            cmap_name: matplotlib colormap
+            color_range: (vmin, vmax) of the color values, default their extremes
+            solid: matplotlib color used when no color values are accumulated
+        """
+        image = np.zeros((self.height, self.width, 4), dtype=np.uint8)
+        image[:, :, 3] = (self.density() * 255).round()
+        if self.color_sum is None and solid != "black":
+            from matplotlib.colors import to_rgb
+            image[:, :, :3] = (np.array(to_rgb(solid)) * 255).round()
+
+        if self.color_sum is not None and self.color_sum.ndim == 2:
+            hit = self.counts > 0
+            mean = np.zeros(self.color_sum.shape)
+            mean[:, hit] = self.color_sum[:, hit] / self.counts[hit]
+            mean = np.clip(mean, 0, 1).reshape(-1, self.height, self.width)
+            image[:, :, :3] = (np.moveaxis(mean[:3], 0, -1) * 255).round()
+            if len(mean) > 3:
+                image[:, :, 3] = (image[:, :, 3] * mean[3]).round()
+
+        elif self.color_sum is not None:
+            hit = self.counts > 0
+            mean = np.zeros(self.counts.shape)
+            mean[hit] = self.color_sum[hit] / self.counts[hit]
+            if color_range is None:
+                color_range = (mean[hit].min(), mean[hit].max()) if hit.any() else (0, 1)
+            vmin, vmax = color_range
+            scaled = (mean - vmin) / ((vmax - vmin) or 1)
+            lut = colormap_lut(cmap_name)
+            index = np.clip(scaled * (len(lut) - 1), 0, len(lut) - 1).round().astype(np.intp)
+            image[:, :, :3] = lut[index].reshape(self.height, self.width, 3)
+
+        return image
+
+    def savepng(self, outfile, cmap_name="jet", color_range=None, solid="black"):
+        """ Tone map the histogram and save it as png file."""
+        write_png(png_filename(outfile), self.image(cmap_name, color_range, solid))
+
+
+def square_extent(points, margin=0.02):
+    """ Square (xmin, xmax, ymin, ymax) around points of shape (N, 2)."""
+    if len(points) == 0:
+        return (-1, 1, -1, 1)
+    low = points.min(axis=0)
+    high = points.max(axis=0)
+    center = (low + high) / 2
+    half = ((high - low).max() / 2 or 1) * (1 + margin)
+    return (center[0] - half, center[0] + half, center[1] - half, center[1] + half)
+
+
+def downsample(image, factor):
+    """ Average blocks of factor x factor pixels of an RGBA uint8 image.
+
+        The colors are averaged weighted by their opacity, so transparent
+        pixels do not darken the edges. The blocks are summed as integers a
+        band of rows at a time, so only the band is ever widened.
+    """
+    if factor == 1:
+        return image
+    height, width = image.shape[0] // factor, image.shape[1] // factor
+    result = np.empty((height, width, 4), dtype=np.uint8)
+    band = max(DOWNSAMPLE_BAND // (width * factor * factor), 1)  # result rows per band
+
+    for top in range(0, height, band):
+        bottom = min(top + band, height)
+        blocks = image[top*factor:bottom*factor, :width*factor]
+        blocks = blocks.reshape(bottom - top, factor, width, factor, 4)
+        alpha = blocks[..., 3].astype(np.uint32)
+        covered = alpha.sum(axis=(1, 3))
+        rgb = (blocks[..., :3] * alpha[..., None]).sum(axis=(1, 3), dtype=np.uint32)
+        rgb = rgb.astype(np.float32)
+        rgb /= np.maximum(covered, 1)[..., None]
+        result[top:bottom, :, :3] = np.rint(rgb)
+        result[top:bottom, :, 3] = np.rint(covered.astype(np.float32) / factor**2)
+    return result
+
+
+@instrument("rasterize", points=lambda points, *args, **kwargs: len(points))
+def rasterize(points, colors=None, resolution=1024, extent=None, cmap_name="jet",
+              color_range=None, supersample=1):
+    """ Draw points straight into an RGBA uint8 image without a matplotlib Figure.
+
+        Parameters
+        ----------
+        points: matrix of shape (N, 2) with the points
+        colors: array with a color value per point, matrix with RGB(A) values
+                between 0 and 1 per point, a matplotlib color name or None
+                for black
+        resolution: int or (width, height), size of the image in pixels
+        extent: (xmin, xmax, ymin, ymax) shown, default a square around the points
+        cmap_name: matplotlib colormap for color values
+        color_range: (vmin, vmax) of the color values, default their extremes
+        supersample: int, every pixel is binned as supersample x supersample
+                     subpixels which are averaged, for antialiasing
+
+        Returns
+        -------
+        Array of shape (height, width, 4) with the image.
+    """
+    if np.isscalar(resolution):
+        resolution = (resolution, resolution)
+    width, height = resolution
+    if extent is None:
+        extent = square_extent(points)
+
+    values = colors is not None and not isinstance(colors, str)
+    channels = np.shape(colors)[1] if values and np.ndim(colors) == 2 else values
+    histogram = DensityHistogram((width*supersample, height*supersample), extent, channels)
+    for start in range(0, len(points), CHUNK_SIZE):
+        stop = start + CHUNK_SIZE
+        histogram.add(points[start:stop], colors[start:stop] if values else None)
+    solid = colors if isinstance(colors, str) else "black"
+    return downsample(histogram.image(cmap_name, color_range, solid), supersample)
+
+
+def progressive(chunks, histogram, tolerance=0.05, min_points=0, preview=None):
+    """ Feed chunks into a histogram until the image has converged.
+
+        Every time the number of points has doubled since the last check the
+        normalized histogram is compared with the one of that check. The
+        change, the L1 distance between the two, mainly measures the sampling
+        noise, which halves when the number of points quadruples.
+
+        Parameters
+        ----------
+        chunks: iterable of (points, colors) with colors None if not used
+        histogram: DensityHistogram the chunks are added to
+        tolerance: float, stop when the change is at most tolerance
+        min_points: int, never stop before this many points were added
+        preview: function preview(histogram, points, change) called at
+                 every check, e.g. to save an intermediate image
+
+        Returns
+        -------
+        (points, converged): number of points added, and True if stopped
+                             because the change was below tolerance
+    """
+    reference = None
+    checked = 0
+    total = 0
+    for points, colors in chunks:
+        histogram.add(points, colors)
+        total += len(points)
+        if total < 2 * checked:
+            continue
+
+        hits = histogram.counts.sum()
+        current = histogram.counts / max(hits, 1)
+        change = np.inf if reference is None else np.abs(current - reference).sum()
+        if preview is not None:
+            preview(histogram, total, change)
+        if change <= tolerance and total >= min_points:
+            return total, True
+        reference, checked = current, total
+    return total, False
@@ -0,0 +1,41 @@
+""" Seeded random number generators shared by the fractal generators.
+
+    All generators draw from counter-based Philox streams, so a run is
+    reproducible from its seed, and independent streams for workers are
+    obtained by jumping ahead instead of by reseeding.
+"""
+import numpy as np
+
+
+def make_rng(seed=None):
+    """ Return a numpy Generator backed by Philox.
+
+        Parameters
+        ----------
+        seed: None, int, SeedSequence or Generator; a Generator is returned
+              as it is, None seeds from fresh entropy
+
+        Returns
+        -------
+        numpy.random.Generator
+    """
+    if isinstance(seed, np.random.Generator):
+        return seed
+    return np.random.Generator(np.random.Philox(seed))
+
+
+def spawn(rng, count):
+    """ Return count independent Generators derived from rng.
+
+        The k-th stream is the Philox state of rng jumped ahead k+1 times by
+        2**128 draws, so the streams never overlap each other or rng, and
+        they only depend on the state of rng. Afterwards rng itself is jumped
+        past the streams, so the next spawn gives new streams.
+    """
+    bit_generator = rng.bit_generator
+    if not isinstance(bit_generator, np.random.Philox):
+        bit_generator = np.random.Philox(rng.integers(2**63))
+    streams = [np.random.Generator(bit_generator.jumped(k + 1)) for k in range(count)]
+    if bit_generator is rng.bit_generator:
+        bit_generator.state = bit_generator.jumped(count + 1).state
+    return streams
@@ -0,0 +1,94 @@
+""" Out-of-core storage of generated points in memory-mapped .npy files.
+
+    A store is a directory with points.npy (float32 by default), an optional
+    corners.npy (uint8 or uint16) and meta.json. All generated points are
+    written, including the burn-in; the discarded points are skipped by a
+    view offset when the store is read, so no data is ever copied.
+"""
+import json
+import os
+import numpy as np
+from engine import corner_dtype
+
+
+class PointStore:
+    """ Memory-mapped points and corners of a fractal on disk.
+
+        Parameters
+        ----------
+        path: string, directory of the store
+        mode: "r" to read, "r+" to also write into the arrays
+
+        Attributes
+        ----------
+        points: matrix of shape (length - discard, 2), view of the kept points
+        corners: array with the corner of every kept point, or None
+        discard: int, number of stored points skipped at the start
+    """
+    def __init__(self, path, mode="r"):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as infile:
+            self.meta = json.load(infile)
+        self.discard = self.meta["discard"]
+
+        self._points = np.load(os.path.join(path, "points.npy"), mmap_mode=mode)
+        corners = os.path.join(path, "corners.npy")
+        self._corners = np.load(corners, mmap_mode=mode) if os.path.exists(corners) else None
+
+    @classmethod
+    def create(cls, path, length, discard=0, corners=None, dtype=np.float32, **meta):
+        """ Create an empty store with room for length points and open it for writing.
+
+            Parameters
+            ----------
+            path: string, directory of the store, created if missing
+            length: int, number of points including the discarded ones
+            discard: int, number of points skipped when reading
+            corners: int or None, number of corners; if given a corner array
+                     of the smallest unsigned integer type is stored
+            dtype: data type of the points
+            meta: further json serializable values stored in meta.json
+        """
+        os.makedirs(path, exist_ok=True)
+        np.lib.format.open_memmap(os.path.join(path, "points.npy"), mode="w+",
+                                  dtype=dtype, shape=(length, 2))
+        corner_file = os.path.join(path, "corners.npy")
+        if corners is not None:
+            np.lib.format.open_memmap(corner_file, mode="w+", dtype=corner_dtype(corners),
+                                      shape=(length,))
+        elif os.path.exists(corner_file):
+            os.remove(corner_file)
+
+        meta = dict(meta, length=int(length), discard=int(discard))
+        with open(os.path.join(path, "meta.json"), "w") as outfile:
+            json.dump(meta, outfile)
+        return cls(path, mode="r+")
+
+    @property
+    def points(self):
+        return self._points[self.discard:]
+
+    @property
+    def corners(self):
+        return None if self._corners is None else self._corners[self.discard:]
+
+    def __len__(self):
+        return len(self._points) - self.discard
+
+    def write(self, start, points, corners=None):
+        """ Write a chunk of points (and corners) at row start, counting the discarded rows."""
+        self._points[start:start + len(points)] = points
+        if corners is not None and self._corners is not None:
+            self._corners[start:start + len(corners)] = corners
+
+    def flush(self):
+        """ Make sure everything written is on disk."""
+        self._points.flush()
+        if self._corners is not None:
+            self._corners.flush()
+
+    def chunks(self, chunk_size=1_000_000):
+        """ Yield the kept points in chunks of at most chunk_size rows."""
+        points = self.points
+        for start in range(0, len(points), chunk_size):
+            yield points[start:start + chunk_size]
@@ -0,0 +1,44 @@
+import os
+import numpy as np
+import batch_render
+
+
+SPEC = {"resolution": 16, "steps": 2000,
+        "chaos_game": {"n": {"start": 3, "stop": 5}, "r": [0.5],},
+        "variations": [None, {"linear": 0.5, "swirl": 0.5}],
+        "ifs": [{"name": "line", "transforms": [[0.5, 0, 0, 0.5, 0, 0], [0.5, 0, 0, 0.5, 0.5, 0.5]],
+                 "probabilities": [0.5, 0.5]}]}
+
+
+def test_expand_spec():
+    """ Test if every combination of the sweep becomes a job with its own output."""
+    jobs = batch_render.expand_spec(SPEC)
+    assert len(jobs) == 2*1*2 + 1
+    assert len({job["filename"] for job in jobs}) == len(jobs)
+    assert {job["n"] for job in jobs if job["kind"] == "chaos_game"} == {3, 4}
+
+
+def test_run_skips_existing(tmp_path):
+    """ Test if all images are rendered once and existing ones are skipped."""
+    jobs = batch_render.expand_spec(SPEC)
+    directory = str(tmp_path)
+    rendered = batch_render.run(jobs, directory, workers=1, report=lambda text: None)
+    assert sorted(os.listdir(directory)) == sorted(job["filename"] for job in jobs)
+    assert len(rendered) == len(jobs)
+    assert batch_render.run(jobs, directory, workers=2, report=lambda text: None) == []
+
+
+def test_ifs_extent():
+    """ Test if an IFS is framed by its whole attractor, not the first chunk."""
+    system = SPEC["ifs"][0]
+    job, = batch_render.expand_spec({"ifs": [system], "chunk_size": 50})
+    assert job["extent"] is None
+    ifs = batch_render.IFS([batch_render.AffineTransform(*values) for values in system["transforms"]],
+                           system["probabilities"], seed=3)
+    xmin, xmax, ymin, ymax = ifs._extent()
+    points = ifs.iterate(20_000)
+    assert np.all((points[:, 0] >= xmin) & (points[:, 0] <= xmax))
+    assert np.all((points[:, 1] >= ymin) & (points[:, 1] <= ymax))
+
+    job, = batch_render.expand_spec({"ifs": [dict(system, extent=[0, 1, 0, 1])]})
+    assert job["extent"] == [0, 1, 0, 1]
@@ -0,0 +1,16 @@
+import benchmark
+
+
+def test_compare_flags_regressions():
+    """ Test if only cases slower than the tolerance allows are flagged."""
+    baseline = {"a": {"points_per_second": 100}, "b": {"points_per_second": 100}}
+    results = {"a": {"points_per_second": 80}, "b": {"points_per_second": 70},
+               "c": {"points_per_second": 1}}
+    assert benchmark.compare(results, baseline, tolerance=0.25) == ["b"]
+
+
+def test_measure():
+    """ Test if measure reports the points per second of a case."""
+    result = benchmark.measure(lambda: sum(range(1000)), 1000, repeat=2)
+    assert result["points_per_second"] == 1000 / result["seconds"]
+    assert result["peak_bytes"] >= 0
@@ -0,0 +1,39 @@
+import os
+import numpy as np
+import cache
+import chaos_game
+
+
+def test_cache_hit(tmp_path, monkeypatch):
+    """ Test if a second request is read from the cache without iterating."""
+    attractors = cache.AttractorCache(str(tmp_path))
+    first = attractors.chaos_game(5, 0.4, 10_000, seed=3)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("a cache hit must not iterate")
+    monkeypatch.setattr(chaos_game.ChaosGame, "iterate", fail)
+
+    second = attractors.chaos_game(5, 0.4, 10_000, seed=3)
+    assert isinstance(second.X, np.memmap)
+    assert np.array_equal(first.X, second.X)
+    assert np.array_equal(first.color, second.color)
+
+
+def test_cache_key():
+    """ Test if every parameter changes the key."""
+    key = cache.cache_key(generator="ChaosGame", n=5, r=0.4, steps=10, discard=5, seed=0)
+    assert key == cache.cache_key(generator="ChaosGame", n=5, r=0.4, steps=10, discard=5, seed=0)
+    assert key != cache.cache_key(generator="ChaosGame", n=5, r=0.4, steps=10, discard=5, seed=1)
+    assert key != cache.cache_key(generator="ChaosGame", n=6, r=0.4, steps=10, discard=5, seed=0)
+
+
+def test_cache_eviction(tmp_path):
+    """ Test if the least recently used entries are evicted above the size limit."""
+    attractors = cache.AttractorCache(str(tmp_path), max_bytes=25_000)
+    for seed in range(4):
+        attractors.fern(2000, seed=seed)
+    entries = os.listdir(str(tmp_path))
+    assert len(entries) == 1
+    assert attractors.size() <= 25_000
+    assert np.allclose(attractors.fern(2000, seed=3), cache.fern.fern_maker(2000, seed=3), atol=1e-5)
+    assert len(os.listdir(str(tmp_path))) == 1
@@ -43,6 +43,106 @@ def test_gradient_color():
     test.show(True)
 
 
+def test_iterate_bit_identical():
+    """ Test if the blocked iteration reproduces the point by point algorithm for a given seed."""
+    test = chaos_game.ChaosGame(6, 1/3, seed=2020)
+    steps = 1000
+
+    rng = chaos_game.make_rng(2020)
+    rng.random(test.n)  # the starting point
+    X = np.empty((steps, 2))
+    X[0] = test.start_value
+    corners = np.zeros(steps)
+    for i in range(steps-1):
+        c = rng.integers(test.n)
+        X[i+1] = test.r * X[i] + (1-test.r) * test._corners[c]
+        corners[i+1] = c
+
+    test.iterate(steps)
+    assert np.array_equal(test.X, X[5:])
+    assert np.array_equal(test._random_corners, corners[5:])
+
+
+def test_iterate_workers():
+    """ Test if parallel walkers fill the output and are reproducible for a given seed."""
+    test = chaos_game.ChaosGame(5, 0.4)
+    test.iterate(20_000, discard=20, workers=4, seed=7)
+    X, corners = test.X, test._random_corners
+
+    assert X.shape == (19_980, 2)
+    assert np.all(np.sqrt(np.sum(X**2, axis=1)) <= 1)
+    assert set(np.unique(corners)) <= set(range(5))
+
+    test.iterate(20_000, discard=20, workers=4, seed=7)
+    assert np.array_equal(test.X, X)
+    test.iterate(20_000, discard=20, workers=4)
+    assert not np.array_equal(test.X, X)
+
+
+def test_iterate_more_workers_than_points():
+    """ Test if walkers without points are skipped instead of failing."""
+    test = chaos_game.ChaosGame(3, start="attractor")
+    test.iterate(3, discard=0, workers=4)
+    assert test.X.shape == (3, 2)
+    assert np.all(np.isfinite(test.X))
+
+
+def test_iterate_seed():
+    """ Test if a seed makes a single walker reproducible on unseeded instances."""
+    first = chaos_game.ChaosGame(5, 0.4)
+    first.iterate(1000, seed=7)
+    second = chaos_game.ChaosGame(5, 0.4)
+    second.iterate(1000, seed=7)
+    assert np.array_equal(first.X, second.X)
+
+
+def test_color():
+    """ Test if the vectorized color values follow the recurrence and are cached."""
+    test = chaos_game.ChaosGame(5)
+    test.iterate(10_000)
+    corners = test._random_corners
+
+    expected = np.empty(len(corners))
+    expected[0] = corners[0]
+    for i in range(len(corners)-1):
+        expected[i+1] = 0.5 * (expected[i] + corners[i+1])
+
+    assert test.color.dtype == np.float32
+    assert np.allclose(test.color, expected, atol=1e-5)
+    assert test.color is test.color
+
+    chunks = list(test.iterate_chunks(10_000, chunk_size=3000, color=True))
+    colors = np.concatenate([colors for X, c, colors in chunks])
+    assert np.allclose(colors, chaos_game.color_recurrence(np.concatenate([c for X, c, colors in chunks])))
+
+
+def test_iterate_extend():
+    """ Test if extending a run gives the same points as one longer run."""
+    whole = chaos_game.ChaosGame(5, 0.4, seed=8)
+    whole.iterate(10_000)
+
+    test = chaos_game.ChaosGame(5, 0.4, seed=8)
+    test.iterate(3000)
+    test.color
+    for steps in (1000, 2500, 3500):
+        test.iterate(steps, extend=True)
+    assert np.array_equal(test.X, whole.X)
+    assert np.allclose(test.color, chaos_game.color_recurrence(test._random_corners), atol=1e-5)
+
+
+def test_checkpoint():
+    """ Test if a restored checkpoint continues the run exactly."""
+    test = chaos_game.ChaosGame(6, 1/3, seed=9)
+    test.iterate(5000)
+    state = test.get_state()
+    test.iterate(2000, extend=True)
+
+    restored = chaos_game.ChaosGame(6, 1/3)
+    restored.set_state(state)
+    restored.iterate(2000, extend=True)
+    assert np.array_equal(restored.X, test.X[-2000:])
+
+
 def test_savepng():
     """ Test if only png files can be generated."""
     test = chaos_game.ChaosGame()
@@ -66,6 +166,157 @@ def test_savepng():
     print("program recognize .png, as it should")
 
 
+def test_float32_points():
+    """ Test if float32 points are the float64 points rounded, also across
+        chunks and extensions, and if the corners are stored as uint8.
+    """
+    reference = chaos_game.ChaosGame(5, 0.4, seed=3)
+    reference.iterate(200_000)
+    compact = chaos_game.ChaosGame(5, 0.4, seed=3, dtype=np.float32)
+    compact.iterate(150_000)
+    compact.iterate(50_000, extend=True)
+    assert compact.X.dtype == np.float32
+    assert compact._random_corners.dtype == np.uint8
+    assert np.array_equal(compact.X, reference.X.astype(np.float32))
+    assert np.array_equal(compact._random_corners, reference._random_corners)
+
+    chunks = chaos_game.ChaosGame(5, 0.4, seed=3).iterate_chunks(200_000, chunk_size=70_000,
+                                                                 dtype=np.float32)
+    assert np.array_equal(np.concatenate([X for X, _ in chunks]), compact.X)
+
+
+def test_sample_ngon_uniform():
+    """ Test if the sampled start points lie in the n-gon and are uniform:
+        the fraction inside the inscribed circle is its share of the area.
+    """
+    n = 6
+    points = chaos_game.sample_ngon(n, 200_000, rng=0)
+    assert points.shape == (200_000, 2)
+    apothem = np.cos(np.pi / n)
+    angles = np.arctan2(points[:, 0], points[:, 1]) % (2 * np.pi / n) - np.pi / n
+    assert np.all(np.hypot(*points.T) * np.cos(angles) <= apothem + 1e-12)
+
+    area = n / 2 * np.sin(2 * np.pi / n)
+    inside = np.mean(np.hypot(*points.T) < apothem)
+    assert abs(inside - np.pi * apothem**2 / area) < 0.01
+    assert chaos_game.ngon_corners(n) is chaos_game.ChaosGame(n)._corners
+
+
+def test_attractor_start():
+    """ Test if attractor start points lie on the Sierpinski triangle, so
+        that a run without discarded points only hits pixels of the attractor.
+    """
+    reference = chaos_game.ChaosGame(3, 0.5, seed=0)
+    histogram = chaos_game.DensityHistogram(64, reference._extent())
+    for points, _ in reference.iterate_chunks(1_000_000):
+        histogram.add(points)
+
+    starts = chaos_game.attractor_points(3, 0.5, 10_000, rng=1)
+    index, inside = histogram._pixels(starts)
+    assert inside.all() and np.all(histogram.counts[index] > 0)
+
+    game = chaos_game.ChaosGame(3, 0.5, seed=2, start="attractor")
+    game.iterate(1000, discard=0)
+    index, inside = histogram._pixels(game.X)
+    assert inside.all() and np.all(histogram.counts[index] > 0)
+
+
+def test_generalized_game_matches_loop():
+    """ Test if probabilities, ratios, rotations and a no-repeat rule give the
+        points of a plain per-step loop with the same random numbers.
+    """
+    n, steps = 5, 20_000
+    probabilities = [1, 2, 3, 2, 1]
+    ratios = [0.4, 0.5, 0.45, 0.5, 0.35]
+    rotations = [0, 0.3, -0.2, 0, 0.1]
+    game = chaos_game.ChaosGame(n, 0.5, seed=4, probabilities=probabilities, ratios=ratios,
+                                rotations=rotations, rule=(0,))
+    game.iterate(steps, discard=0)
+    assert np.all(game._random_corners[2:] != game._random_corners[1:-1])
+
+    rng = chaos_game.make_rng(4)
+    rng.random(n)  # the start point
+    uniforms = rng.random(steps - 1)
+    weights = np.array(probabilities, dtype=float)
+    X = np.empty((steps, 2))
+    X[0] = game.start_value
+    previous = None
+    for i, u in enumerate(uniforms):
+        allowed = weights.copy()
+        if previous is not None:
+            allowed[previous] = 0
+        c = np.searchsorted(np.cumsum(allowed / allowed.sum()), u, side="right")
+        angle = rotations[c]
+        rotation = np.array([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]])
+        corner = game._corners[c]
+        X[i+1] = corner + ratios[c] * rotation @ (X[i] - corner)
+        assert c == game._random_corners[i+1]
+        previous = c
+    assert np.allclose(game.X, X, atol=1e-12)
+
+
+def test_markov_choices_many_corners():
+    """ Test if the lane and the step by step scan of a rule give the choices
+        of a plain loop, also for many corners.
+    """
+    rng = np.random.default_rng(2)
+    for n in (5, 40):
+        table = rng.random((n, n))
+        table[np.arange(n), np.arange(n)] = 0
+        cumulative = np.cumsum(table / table.sum(axis=1, keepdims=True), axis=1)
+        cumulative[:, -1] = 1
+        uniforms = rng.random(30_000)
+        choices = chaos_game.markov_choices(cumulative, uniforms, 1, block_size=4096)
+        previous = 1
+        for u, c in zip(uniforms, choices):
+            previous = min(np.searchsorted(cumulative[previous], u, side="right"), n - 1)
+            assert c == previous
+
+
+def test_generalized_game_chunks_and_extend():
+    """ Test if a game with a rule gives the same points in chunks, extended
+        and in one run, and if the probabilities are respected.
+    """
+    options = dict(probabilities=[4, 1, 1, 1], rule=[[0, 1, 1, 1], [1, 0, 1, 1],
+                                                     [1, 1, 0, 1], [1, 1, 1, 0]])
+    whole = chaos_game.ChaosGame(4, 0.5, seed=1, **options)
+    whole.iterate(100_000)
+    parts = chaos_game.ChaosGame(4, 0.5, seed=1, **options)
+    parts.iterate(60_000)
+    parts.iterate(40_000, extend=True)
+    assert np.array_equal(parts.X, whole.X)
+
+    chunks = chaos_game.ChaosGame(4, 0.5, seed=1, **options).iterate_chunks(100_000, chunk_size=30_000)
+    assert np.array_equal(np.concatenate([X for X, _ in chunks]), whole.X)
+
+    free = chaos_game.ChaosGame(4, 0.5, seed=1, probabilities=[4, 1, 1, 1])
+    free.iterate(100_000)
+    counts = np.bincount(free._random_corners, minlength=4) / len(free._random_corners)
+    assert np.allclose(counts, [4/7, 1/7, 1/7, 1/7], atol=0.01)
+
+
+def test_palette_colors(tmp_path):
+    """ Test if palette colors follow c[i+1] = 0.5*(c[i] + palette[corner]) and
+        if a streamed render averages them per pixel.
+    """
+    palette = [(1, 0, 0), (0, 1, 0), (0, 0, 1)]
+    game = chaos_game.ChaosGame(3, 0.5, seed=0, palette=palette)
+    game.iterate(10_000)
+    colors = game.color
+    assert colors.shape == (len(game.X), 3)
+    expected = np.empty(colors.shape)
+    expected[0] = palette[game._random_corners[0]]
+    for i in range(1, len(expected)):
+        expected[i] = 0.5 * (expected[i-1] + palette[game._random_corners[i]])
+    assert np.allclose(colors, expected, atol=1e-6)
+
+    histogram = chaos_game.ChaosGame(3, 0.5, seed=0, palette=palette).render(
+        tmp_path / "fig.png", 200_000, color=True, resolution=64)
+    assert histogram.color_sum.shape == (3, 64 * 64)
+    hit = histogram.counts > 0
+    assert np.allclose(histogram.color_sum[:, hit].sum(axis=0), histogram.counts[hit])
+
+
 if __name__ == "__main__":
     # test_generate_ngon()
     # test_starting_point()
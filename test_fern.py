@@ -0,0 +1,40 @@
+import numpy as np
+import fern
+
+
+def test_ifs_matches_next_point():
+    """ Test if the block iteration of the IFS follows the point by point algorithm."""
+    points = fern.fern_maker(5000, seed=3)
+
+    rng = fern.make_rng(3)
+    expected = np.zeros((5000, 2))
+    for i in range(len(expected)-1):
+        expected[i+1] = fern.next_point(expected[i], rng)
+
+    assert np.allclose(points, expected, rtol=0, atol=1e-12)
+
+
+def test_ifs_probabilities():
+    """ Test if the transformations are chosen with the given probabilities."""
+    ifs = fern.IFS(fern.functions, [0.1, 0.2, 0.3, 0.4])
+    counts = np.bincount(ifs.choose(100_000), minlength=4) / 100_000
+    assert np.allclose(counts, [0.1, 0.2, 0.3, 0.4], atol=0.01)
+
+
+def test_fern_workers_reproducible():
+    """ Test if parallel walkers give the same fern for the same seed."""
+    first = fern.fern_maker(10_000, workers=3, seed=5)
+    second = fern.fern_maker(10_000, workers=3, seed=5)
+    assert np.array_equal(first, second)
+    assert not np.array_equal(first, fern.fern_maker(10_000, workers=3, seed=6))
+
+
+def test_fern_float32():
+    """ Test if float32 fern points are the float64 points rounded, also chunk by chunk."""
+    reference = fern.fern_maker(300_000, seed=2)
+    compact = fern.fern_maker(300_000, seed=2, dtype=np.float32)
+    assert compact.dtype == np.float32
+    assert np.array_equal(compact, reference.astype(np.float32))
+    ifs = fern.IFS(fern.functions, np.diff(fern.fp_cumulative, prepend=0), seed=2)
+    chunks = ifs.iterate_chunks(300_000, chunk_size=100_000, dtype=np.float32)
+    assert np.array_equal(np.concatenate(list(chunks)), compact)
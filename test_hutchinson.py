@@ -0,0 +1,45 @@
+import numpy as np
+from chaos_game import ChaosGame
+from fern import barnsley
+from hutchinson import hutchinson
+from render import DensityHistogram
+
+
+def test_hutchinson_matches_random_density():
+    """ The Hutchinson density of the Sierpinski triangle differs from the
+        histogram of a long chaos game by about as much as two chaos games
+        differ from each other.
+    """
+    def chaos_game_density(seed):
+        histogram = DensityHistogram(128, extent)
+        for points, _ in ChaosGame(3, 0.5, seed=seed).iterate_chunks(2_000_000):
+            histogram.add(points)
+        return histogram.counts / histogram.counts.sum()
+
+    game = ChaosGame(3, 0.5, seed=0)
+    extent = game._extent()
+    matrices = np.repeat([0.5 * np.eye(2)], 3, axis=0)
+    offsets = 0.5 * game._corners
+    density = hutchinson(matrices, offsets, np.ones(3), 128, extent, subsamples=4).counts
+
+    reference = chaos_game_density(0)
+    noise = np.abs(chaos_game_density(1) - reference).sum()
+    assert np.abs(density / density.sum() - reference).sum() < 2 * noise
+
+
+def test_hutchinson_color(tmp_path):
+    """ The mean color stays within the color values of the maps."""
+    game = ChaosGame(4, 0.4)
+    histogram = game.render_hutchinson(tmp_path / "fig.png", color=True, resolution=64)
+    hit = histogram.counts > 0
+    mean = histogram.color_sum[hit] / histogram.counts[hit]
+    assert mean.min() >= 0 and mean.max() <= 3
+    assert np.isclose(histogram.counts.mean() * 64 * 64, 100 * np.count_nonzero(hit))
+
+
+def test_hutchinson_fern(tmp_path):
+    """ The fern density fills a png of the requested size."""
+    histogram = barnsley.render_hutchinson(tmp_path / "fern.png", resolution=64, passes=8)
+    assert (tmp_path / "fern.png").exists()
+    assert histogram.counts.shape == (64 * 64,)
+    assert np.count_nonzero(histogram.counts) > 0
@@ -0,0 +1,19 @@
+import os
+import subprocess
+import sys
+
+
+def test_compute_modules_without_matplotlib(tmp_path):
+    """ Test if the compute modules import and run without loading matplotlib,
+        also for rendering a png.
+    """
+    code = ("import sys, chaos_game, fern, variations, batch_render, cache\n"
+            "game = chaos_game.ChaosGame(3, 0.5, seed=0)\n"
+            "game.iterate(1000)\n"
+            "variations.variations(game.X)({'swirl': 1})\n"
+            "assert not [m for m in sys.modules if m.startswith('matplotlib')]\n"
+            "game.savepng(sys.argv[1], resolution=32)\n"
+            "assert 'matplotlib.pyplot' not in sys.modules\n")
+    env = {key: value for key, value in os.environ.items() if key != "MPLBACKEND"}
+    directory = os.path.dirname(os.path.abspath(__file__))
+    subprocess.run([sys.executable, "-c", code, str(tmp_path / "fig.png")], env=env, check=True, cwd=directory)
@@ -0,0 +1,45 @@
+import json
+import os
+import subprocess
+import sys
+import chaos_game
+import profiling
+
+
+def test_profile_stages(tmp_path):
+    """ Test if the profiled stages are recorded with their points and saved as json."""
+    outfile = str(tmp_path / "profile.json")
+    game = chaos_game.ChaosGame(4, 0.4, seed=0)
+    with profiling.profile(outfile) as stats:
+        game.iterate(50_000)
+        game.color
+        game.savepng(str(tmp_path / "fig.png"), color=True, resolution=64, supersample=1)
+
+    for name in ("ChaosGame.iterate", "ChaosGame.color", "ChaosGame.savepng",
+                 "rasterize", "write_png"):
+        assert stats[name]["calls"] == 1
+    assert stats["ChaosGame.iterate"]["points"] == 50_000
+    assert stats["ChaosGame.iterate"]["peak_bytes"] >= 50_000 * 16
+    assert stats["ChaosGame.savepng"]["seconds"] >= stats["rasterize"]["seconds"]
+    with open(outfile) as infile:
+        assert json.load(infile) == stats
+    assert not profiling.enabled()
+
+
+def test_disabled_records_nothing():
+    """ Test if nothing is recorded outside of a profile block."""
+    profiling.reset()
+    game = chaos_game.ChaosGame(3, 0.5, seed=0)
+    game.iterate(1000)
+    assert profiling.report() == {}
+
+
+def test_environment_variable(tmp_path):
+    """ Test if setting CHAOS_PROFILE writes the report when the process exits."""
+    outfile = tmp_path / "profile.json"
+    env = dict(os.environ, CHAOS_PROFILE=str(outfile), MPLBACKEND="Agg")
+    code = "import chaos_game; chaos_game.ChaosGame(3, 0.5, seed=0).iterate(1000)"
+    subprocess.run([sys.executable, "-c", code], env=env, check=True,
+                   cwd=os.path.dirname(os.path.abspath(__file__)))
+    with open(outfile) as infile:
+        assert json.load(infile)["ChaosGame.iterate"]["points"] == 1000
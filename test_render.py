@@ -0,0 +1,89 @@
+import numpy as np
+import matplotlib.image as mpimg
+import chaos_game
+import render
+
+
+def test_write_png(tmp_path):
+    """ Test if a written png is read back unchanged."""
+    image = np.random.randint(0, 256, size=(7, 5, 4)).astype(np.uint8)
+    filename = str(tmp_path / "test_render.png")
+    render.write_png(filename, image)
+    read = mpimg.imread(filename)
+    assert np.array_equal((read * 255).round().astype(np.uint8), image)
+
+
+def test_histogram_counts():
+    """ Test if the histogram counts every point inside the extent once."""
+    points = np.random.uniform(-1.5, 1.5, size=(10_000, 2))
+    histogram = render.DensityHistogram((40, 30))
+    histogram.add(points[:5000])
+    histogram.add(points[5000:])
+    inside = np.all(np.abs(points) < 1, axis=1)
+    assert histogram.counts.sum() == inside.sum()
+
+
+def test_iterate_chunks():
+    """ Test if chunked iteration generates the same points as iterate."""
+    test = chaos_game.ChaosGame(5, 0.4)
+    test.iterate(10_000, discard=7, seed=11)
+
+    test.rng = chaos_game.make_rng(11)
+    test._starting_point()
+    chunks = list(test.iterate_chunks(10_000, discard=7, chunk_size=999))
+    assert np.array_equal(np.concatenate([X for X, corners in chunks]), test.X)
+    assert np.array_equal(np.concatenate([c for X, c in chunks]), test._random_corners)
+
+
+def test_render(tmp_path):
+    """ Test if streaming rendering produces an image of the right size."""
+    test = chaos_game.ChaosGame(4, 1/3)
+    histogram = test.render(str(tmp_path / "test_render"), 100_000, color=True, resolution=(64, 48), chunk_size=30_000)
+    assert histogram.counts.sum() == 100_000 - 5
+    assert mpimg.imread(str(tmp_path / "test_render.png")).shape == (48, 64, 4)
+
+
+def test_downsample():
+    """ Test if blocks are averaged weighted by their opacity, also in bands."""
+    image = np.zeros((4, 6, 4), dtype=np.uint8)
+    image[0, 0] = (200, 100, 0, 255)
+    image[1, 1] = (100, 0, 60, 85)
+    image[2:, 4:] = (10, 20, 30, 255)
+    render.DOWNSAMPLE_BAND, band = 1, render.DOWNSAMPLE_BAND
+    try:
+        small = render.downsample(image, 2)
+    finally:
+        render.DOWNSAMPLE_BAND = band
+    assert small.shape == (2, 3, 4)
+    assert tuple(small[0, 0]) == (175, 75, 15, 85)
+    assert tuple(small[1, 2]) == (10, 20, 30, 255)
+    assert not small[0, 1].any() and not small[1, 0].any()
+
+
+def test_rasterize_supersample():
+    """ Test if supersampling keeps the image size and covers the same pixels."""
+    points = np.random.uniform(-1, 1, size=(20_000, 2))
+    image = render.rasterize(points, resolution=(30, 20), extent=(-1, 1, -1, 1))
+    smooth = render.rasterize(points, resolution=(30, 20), extent=(-1, 1, -1, 1), supersample=3)
+    assert image.shape == smooth.shape == (20, 30, 4)
+    assert np.array_equal(image[:, :, 3] > 0, smooth[:, :, 3] > 0)
+
+
+def test_savepng_raster(tmp_path):
+    """ Test if savepng writes a rasterized png of the requested size."""
+    test = chaos_game.ChaosGame(3)
+    test.iterate(10_000)
+    test.savepng(str(tmp_path / "raster"), color=True, resolution=50, supersample=2)
+    assert mpimg.imread(str(tmp_path / "raster.png")).shape == (50, 50, 4)
+
+
+def test_progressive_stops_early(tmp_path):
+    """ Test if progressive rendering stops once the image has converged."""
+    test = chaos_game.ChaosGame(3, seed=5)
+    checks = []
+    histogram = test.render(str(tmp_path / "progressive"), 50_000_000, resolution=32,
+                            chunk_size=10_000, tolerance=0.05,
+                            preview=lambda histogram, points, change: checks.append((points, change)))
+    points, change = checks[-1]
+    assert change <= 0.05 < checks[-2][1]
+    assert histogram.counts.sum() == points < 50_000_000
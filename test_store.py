@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+import chaos_game
+import fern
+import store
+
+
+def test_chaos_game_store(tmp_path):
+    """ Test if a stored run holds the same points as an in-memory run."""
+    path = str(tmp_path / "hexagon")
+    test = chaos_game.ChaosGame(6, 1/3, seed=1)
+    test.iterate(10_000, discard=10, seed=2)
+    X, corners = test.X, test._random_corners
+
+    test.iterate(10_000, discard=10, seed=2, store=path)
+    assert isinstance(test.X, np.memmap) and test.X.dtype == np.float32
+    assert np.array_equal(test.X, X.astype(np.float32))
+    assert np.array_equal(test._random_corners, corners)
+
+    reopened = store.PointStore(path)
+    assert len(reopened) == 9_990 and reopened.discard == 10
+    assert isinstance(reopened.points, np.memmap)
+    assert np.array_equal(reopened.points, test.X)
+    assert np.array_equal(np.concatenate(list(reopened.chunks(3000))), test.X)
+
+
+def test_fern_store(tmp_path):
+    """ Test if the fern is written to the store chunk by chunk without changing it."""
+    points = fern.fern_maker(5000, seed=4)
+    stored = fern.fern_maker(5000, seed=4, store=str(tmp_path / "fern"))
+    assert np.allclose(stored, points, atol=1e-5)
+
+    chunks = list(fern.barnsley.iterate_chunks(5000, chunk_size=1234))
+    assert sum(len(chunk) for chunk in chunks) == 5000
+
+
+def test_load_ends_in_memory_run(tmp_path):
+    """ Test if loading a store replaces an earlier in-memory run for good."""
+    path = str(tmp_path / "pentagon")
+    chaos_game.ChaosGame(5, 0.4, seed=1).iterate(500, store=path)
+    test = chaos_game.ChaosGame(5, 0.4, seed=1)
+    test.iterate(100)
+    test.load(path)
+    assert len(test.X) == 495
+    with pytest.raises(ValueError):
+        test.iterate(10, extend=True)
@@ -0,0 +1,107 @@
+import numpy as np
+import chaos_game
+import variations
+
+
+def test_fused_matches_methods():
+    """ Test if the fused evaluation equals the weighted sum of the single variations."""
+    x = np.random.uniform(-1, 1, 1000)
+    y = np.random.uniform(-1, 1, 1000)
+    test = variations.variations(x, y)
+    coeff = {"linear": 0.1, "handkerchief": 0.1, "swirl": 0.2,
+             "disc": 0.2, "fisheye": 0.15, "exponential": 0.25}
+
+    u_expected = np.zeros(1000)
+    v_expected = np.zeros(1000)
+    for key in coeff:
+        u_temp, v_temp = test.collection[key]()
+        u_expected += coeff[key] * u_temp
+        v_expected += coeff[key] * v_temp
+
+    u, v = test(coeff)
+    assert np.allclose(u, u_expected)
+    assert np.allclose(v, v_expected)
+
+    u, v = variations.fused_variation(x, y, coeff, chunk_size=77)
+    assert np.allclose(u, u_expected)
+    assert np.allclose(v, v_expected)
+
+
+def test_animation_frames():
+    """ Test if the animation frames start at the first and end at the last variation."""
+    x = np.random.uniform(-1, 1, 5000)
+    y = np.random.uniform(-1, 1, 5000)
+    test = variations.variations(x, y, np.random.random(5000))
+    dict_start = {"linear": 1, "swirl": 0}
+    dict_end = {"linear": 0, "swirl": 1}
+    frames = list(test.animation_frames(dict_start, dict_end, 1, fps=5, resolution=32, workers=1))
+    assert len(frames) == 5
+    assert frames[0].shape == (32, 32, 3) and frames[0].dtype == np.uint8
+
+    for coeff, frame in ((dict_start, frames[0]), (dict_end, frames[-1])):
+        u, v = test(coeff)
+        histogram = variations.DensityHistogram(32, (-1, 1, -1, 1))
+        histogram.add(np.column_stack((u, -v)))
+        assert np.array_equal(frame.min(axis=2) < 255, histogram.counts.reshape(32, 32) > 0)
+
+
+def test_fused_variation_float32():
+    """ Test if float32 points are transformed in float32 close to float64."""
+    x = np.random.uniform(-1, 1, 10_000)
+    y = np.random.uniform(-1, 1, 10_000)
+    coeff = {"linear": 0.2, "swirl": 0.3, "disc": 0.5}
+    u, v = variations.fused_variation(x.astype(np.float32), y.astype(np.float32), coeff)
+    assert u.dtype == np.float32 and v.dtype == np.float32
+    expected_u, expected_v = variations.fused_variation(x, y, coeff)
+    assert np.allclose(u, expected_u, atol=1e-5) and np.allclose(v, expected_v, atol=1e-5)
+
+
+def test_point_container_offsets():
+    """ Test if a (N, 2) point container gives the same variation as x and y,
+        and if offsets writes (u, -v) into the given buffer.
+    """
+    game = chaos_game.ChaosGame(5, 0.4, seed=1, order="F")
+    game.iterate(5000)
+    assert game.X[:, 0].flags.c_contiguous
+    test = variations.variations(game.X)
+    assert np.shares_memory(test.x, game.X)
+
+    coeff = {"linear": 0.5, "handkerchief": 0.5}
+    u, v = variations.variations(game.X[:, 0].copy(), game.X[:, 1].copy())(coeff)
+    out = np.empty(game.X.shape, order="F")
+    assert test.offsets(coeff, out) is out
+    assert np.allclose(out[:, 0], u) and np.allclose(out[:, 1], -v)
+
+
+def test_store_points_stay_on_disk(tmp_path):
+    """ Test if memory-mapped store points are transformed without being copied."""
+    game = chaos_game.ChaosGame(5, 0.4, seed=1)
+    game.iterate(20_000, store=str(tmp_path / "store"))
+    test = variations.variations(game.X)
+    assert isinstance(test.x, np.memmap) and isinstance(test.y, np.memmap)
+
+    coeff = {"swirl": 0.5, "disc": 0.5}
+    u, v = test(coeff)
+    expected_u, expected_v = variations.variations(np.array(game.X))(coeff)
+    assert np.array_equal(u, expected_u) and np.array_equal(v, expected_v)
+
+
+def test_transform_chunks():
+    """ Test if streamed chunks give the same points as the whole array, for
+        plain chunks and for the tuples of ChaosGame.iterate_chunks.
+    """
+    game = chaos_game.ChaosGame(6, 1/3, seed=0)
+    game.iterate(30_000)
+    coeff = {"linear": 0.3, "swirl": 0.3, "exponential": 0.4}
+    u, v = variations.variations(game.X)(coeff)
+
+    chunks = (game.X[start:start + 7000] for start in range(0, len(game.X), 7000))
+    points = np.concatenate(list(variations.transform_chunks(chunks, coeff)))
+    assert np.allclose(points, np.column_stack((u, -v)))
+
+    stream = chaos_game.ChaosGame(6, 1/3, seed=0).iterate_chunks(30_000, chunk_size=4000, color=True)
+    histogram = variations.variation_histogram(stream, coeff, 32, (-2, 2, -2, 2), color=True)
+    whole = variations.DensityHistogram(32, (-2, 2, -2, 2), color=True)
+    whole.add(np.column_stack((u, -v)), game.color)
+    assert np.array_equal(histogram.counts, whole.counts)
+    assert np.allclose(histogram.color_sum, whole.color_sum)
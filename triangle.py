@@ -1,5 +1,7 @@
 import numpy as np 
 import matplotlib.pyplot as plt
+from engine import palette_recurrence, ratio_recurrence
+from rng import make_rng
 
 """ Calculating a specific fractal distributions of points within a 3-gon 
     in an iterative manner.
@@ -15,18 +17,19 @@ import matplotlib.pyplot as plt
         1. Color coded with red, green and blue
         2. Color coded with RGB color based on iterative corner
 """ 
+#: seeded generator making the figure reproducible
+SEED = 1988
+rng = make_rng(SEED)
+
 #: array of corner points
 corners = np.array([(0, 0), (1,0), (0.5, np.sqrt(0.75))])
 plt.subplot(2,2,1)
 plt.scatter(*zip(*corners),  marker="x", color="black")
 
 #: array with a randomely selected start point (also test ploted)
-starting_point = np.empty((1000,2))
-for n in range(1000):
-    w = np.random.random(3)
-    w = w/np.sum(w)
-    start = np.array([corners[i] * w[i] for i in range(3)])
-    starting_point[n] = np.sum(start, axis=0)
+weights = rng.random((1000,3))
+weights = weights/np.sum(weights, axis=1, keepdims=True)
+starting_point = weights @ corners
 
 plt.subplot(2,2,2)
 plt.scatter(*zip(*starting_point), s=0.3, color="black")
@@ -38,8 +41,9 @@ X[0] = starting_point[0]
 
 #: plot with iterated points in three colors chosen based corner vicinities
 colors = np.empty(N)
+random_corners = rng.integers(0, 3, size=N-1)
 for i in range(N-1):
-    corner = np.random.randint(0,3)
+    corner = random_corners[i]
     X[i+1] = 0.5 * (X[i] + corners[corner])
     colors[i+1] = corner
 
@@ -61,10 +65,12 @@ plt.axis("off")
 colors = np.zeros((N,3))
 corner_color = ((1,0,0), (0,1,0), (0,0,1))
 
-for i in range(N-1):
-    corner = np.random.randint(0,3)
-    X[i+1] = 0.5 * (X[i] + corners[corner])
-    colors[i+1] = 0.5 * (colors[i] + corner_color[corner])  
+random_corners = rng.integers(0, 3, size=N-1)
+ratio_recurrence(X, 0.5, corners, random_corners)
+colors[1:] = palette_recurrence(random_corners, corner_color, previous=colors[0])
+
+#: the same coloring streamed into a density image, which scales to 100M points:
+#: ChaosGame(3, palette=corner_color).render("trekanter_rgb.png", 100_000_000, color=True)
 
 plt.subplot(2,2,4)
 plt.scatter(*zip(*X), s=0.2, marker=".", c=colors)
@@ -1,10 +1,228 @@
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
-import chaos_game as cg
 import random
 import os
-from fern import fern_maker
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from profiling import instrument
+from render import DensityHistogram, png_filename, pyplot, rasterize, write_png
+
+#: number of points transformed at a time by variations.__call__
+CHUNK_SIZE = 1 << 18
+
+
+def _size(self, *args, **kwargs):
+    """ Number of points of a variations instance, for the profiling stages."""
+    return len(self.x)
+
+
+def _add_scaled(out, term, coeff):
+    """ out += coeff*term without temporaries; term is overwritten."""
+    np.multiply(term, coeff, out=term)
+    np.add(out, term, out=out)
+
+
+def _linear(x, y, shared, coeff, u, v, t):
+    np.multiply(x, coeff, out=t[0])
+    np.add(u, t[0], out=u)
+    np.multiply(y, coeff, out=t[0])
+    np.add(v, t[0], out=v)
+
+
+def _handkerchief(x, y, shared, coeff, u, v, t):
+    r, theta = shared["r"], shared["theta"]
+    np.add(theta, r, out=t[0])
+    np.sin(t[0], out=t[0])
+    np.multiply(t[0], r, out=t[0])
+    _add_scaled(u, t[0], coeff)
+    np.subtract(theta, r, out=t[0])
+    np.cos(t[0], out=t[0])
+    np.multiply(t[0], r, out=t[0])
+    _add_scaled(v, t[0], coeff)
+
+
+def _swirl(x, y, shared, coeff, u, v, t):
+    r2 = shared["r2"]
+    np.sin(r2, out=t[1])
+    np.cos(r2, out=t[2])
+    np.multiply(x, t[1], out=t[0])
+    np.subtract(t[0], np.multiply(y, t[2], out=t[3]), out=t[0])
+    _add_scaled(u, t[0], coeff)
+    np.multiply(x, t[2], out=t[0])
+    np.add(t[0], np.multiply(y, t[1], out=t[3]), out=t[0])
+    _add_scaled(v, t[0], coeff)
+
+
+def _disc(x, y, shared, coeff, u, v, t):
+    r, theta = shared["r"], shared["theta"]
+    np.multiply(r, np.pi, out=t[1])
+    np.sin(t[1], out=t[0])
+    np.multiply(t[0], theta, out=t[0])
+    _add_scaled(u, t[0], coeff / np.pi)
+    np.cos(t[1], out=t[0])
+    np.multiply(t[0], theta, out=t[0])
+    _add_scaled(v, t[0], coeff / np.pi)
+
+
+def _fisheye(x, y, shared, coeff, u, v, t):
+    np.add(shared["r"], 1, out=t[1])
+    np.divide(y, t[1], out=t[0])
+    _add_scaled(u, t[0], 2*coeff)
+    np.divide(x, t[1], out=t[0])
+    _add_scaled(v, t[0], 2*coeff)
+
+
+def _exponential(x, y, shared, coeff, u, v, t):
+    np.subtract(x, 1, out=t[1])
+    np.exp(t[1], out=t[1])
+    np.multiply(y, np.pi, out=t[2])
+    np.cos(t[2], out=t[0])
+    np.multiply(t[0], t[1], out=t[0])
+    _add_scaled(u, t[0], coeff)
+    np.sin(t[2], out=t[0])
+    np.multiply(t[0], t[1], out=t[0])
+    _add_scaled(v, t[0], coeff)
+
+
+#: fused kernels accumulating coeff times a variation into u and v in place
+_kernels = {"linear": _linear, "handkerchief": _handkerchief, "swirl": _swirl,
+            "disc": _disc, "fisheye": _fisheye, "exponential": _exponential}
+
+
+def fused_variation(x, y, coeff, u=None, v=None, chunk_size=CHUNK_SIZE, dtype=None,
+                    scratch=None):
+    """ Evaluates the weighted sum of several variations in one pass.
+
+        The intermediates r**2, r and theta are computed once per chunk and
+        shared by all variations, and every term is accumulated in place into
+        the output arrays, so the transient memory is a handful of chunk
+        sized buffers regardless of the number of points and variations.
+
+        Parameters
+        ----------
+        x: Numpy array containing the x-coords of all points.
+        y: Numpy array containing the y-coords of all points.
+        coeff: A dictionary where the keys are variation names and the values
+               the corresponding coeffecients.
+        u, v: Optional preallocated output arrays shaped like x.
+        chunk_size: The number of points handled at a time.
+        dtype: The floating point type everything is computed in, by
+               default the type of u or else of x (float64 for integers),
+               so float32 points stay float32 end to end.
+        scratch: Optional list of seven work arrays of dtype with at least
+                 min(chunk_size, x.size) elements, reused between calls so
+                 that contiguous input allocates nothing.
+
+        Returns
+        -------
+        Two arrays containing the transformed x-coords and y-coords respectively.
+
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if dtype is None:
+        dtype = u.dtype if u is not None else np.result_type(x.dtype, np.float32)
+    u = np.empty(x.shape, dtype) if u is None else u
+    v = np.empty(y.shape, dtype) if v is None else v
+    keys = [key for key in coeff if coeff[key] != 0]
+    for key in keys:
+        if key not in _kernels:
+            raise KeyError(f"unknown variation {key}")
+    need_theta = any(key in ("handkerchief", "disc") for key in keys)
+    need_r = need_theta or "fisheye" in keys
+    need_r2 = need_r or "swirl" in keys
+
+    size = min(chunk_size, x.size) or 1
+    buffers = [np.empty(size, dtype) for _ in range(7)] if scratch is None else scratch
+    flat = [array.reshape(-1) for array in (x, y, u, v)]
+
+    for start in range(0, x.size, size):
+        stop = min(start + size, x.size)
+        xs, ys, us, vs = (array[start:stop] for array in flat)
+        # memory-mapped or other typed input is converted one chunk at a time
+        xs = np.ascontiguousarray(xs, dtype=dtype)
+        ys = np.ascontiguousarray(ys, dtype=dtype)
+        r2, r, theta, *t = (buffer[:stop-start] for buffer in buffers)
+        shared = {}
+        if need_r2:
+            np.multiply(xs, xs, out=r2)
+            np.add(r2, np.multiply(ys, ys, out=t[0]), out=r2)
+            shared["r2"] = r2
+        if need_r:
+            shared["r"] = np.sqrt(r2, out=r)
+        if need_theta:
+            shared["theta"] = np.arctan2(xs, ys, out=theta)
+
+        us[:] = 0
+        vs[:] = 0
+        for key in keys:
+            _kernels[key](xs, ys, shared, coeff[key], us, vs, t)
+    return u, v
+
+
+def transform_chunks(chunks, coeff):
+    """ Applies the weighted sum of variations to a stream of point chunks.
+
+        Every chunk is transformed by fused_variation as soon as it arrives,
+        so the memory needed only depends on the chunk size and the
+        transform runs pipelined with the generator, e.g.
+        ChaosGame.iterate_chunks, IFS.iterate_chunks or PointStore.chunks.
+        The work buffers are shared by all chunks.
+
+        Parameters
+        ----------
+        chunks: Iterable of arrays of shape (N, 2) with the points, or of
+                tuples with such an array first, like the (points, corners,
+                colors) of ChaosGame.iterate_chunks.
+        coeff: A dictionary where the keys are variation names and the values
+               the corresponding coeffecients.
+
+        Returns
+        -------
+        Generator of arrays of shape (N, 2) with the plotted coordinates
+        (u, -v) of every chunk, as tuples with the other elements of the
+        chunk passed on unchanged if the chunks are tuples.
+
+    """
+    scratch = None
+    for chunk in chunks:
+        points = chunk[0] if isinstance(chunk, tuple) else chunk
+        dtype = np.result_type(points.dtype, np.float32)
+        size = min(CHUNK_SIZE, len(points)) or 1
+        if scratch is None or scratch[0].dtype != dtype or len(scratch[0]) < size:
+            scratch = [np.empty(size, dtype) for _ in range(7)]
+
+        out = np.empty((len(points), 2), dtype, order="F")
+        fused_variation(points[:, 0], points[:, 1], coeff, out[:, 0], out[:, 1], scratch=scratch)
+        np.negative(out[:, 1], out=out[:, 1])
+        yield (out,) + tuple(chunk[1:]) if isinstance(chunk, tuple) else out
+
+
+def variation_histogram(chunks, coeff, resolution=1024, extent=(-1, 1, -1, 1), color=False):
+    """ Streams point chunks through transform_chunks into a DensityHistogram.
+
+        Parameters
+        ----------
+        chunks: Iterable of point arrays or tuples, see transform_chunks;
+                with color the last element of every tuple are the colors.
+        coeff: A dictionary where the keys are variation names and the values
+               the corresponding coeffecients.
+        resolution: Int or (width, height) of the histogram in pixels.
+        extent: (xmin, xmax, ymin, ymax) of the transformed region shown.
+        color: False, True for color values or the number of channels of
+               palette colors, see DensityHistogram.
+
+        Returns
+        -------
+        The DensityHistogram; use its image or savepng method for the picture.
+
+    """
+    histogram = DensityHistogram(resolution, extent, color)
+    for chunk in transform_chunks(chunks, coeff):
+        if isinstance(chunk, tuple):
+            histogram.add(chunk[0], chunk[-1] if color else None)
+        else:
+            histogram.add(chunk)
+    return histogram
 
 
 class variations():
@@ -13,13 +231,15 @@ class variations():
 
     """
 
-    def __init__(self, xvals, yvals, colors="black"):
+    def __init__(self, xvals, yvals=None, colors="black"):
         """ initializes the class with coordinates of points to be transformed
             along with point color.
 
             Parameters
             ----------
-            xvals: Numpy array containing the x-coords of all points.
+            xvals: Numpy array containing the x-coords of all points, or if
+                   yvals is None a single array of shape (N, 2) with the points,
+                   e.g. ChaosGame.X or the output of fern_maker.
             yvals: Numpy array containing the y-coords of all points.
             colors: List containg color values for the points or simply a
                     string containing a color name compatible with matplotlib.
@@ -28,9 +248,19 @@ class variations():
             -------
             Nothing.
 
+            The coordinates are kept as two contiguous arrays, so strided
+            columns of a (N, 2) array are copied once here instead of on
+            every evaluation. Points generated with order="F" already have
+            contiguous columns and are not copied. Memory-mapped points, e.g.
+            PointStore.points, stay on disk as views; fused_variation reads
+            them one chunk at a time.
+
         """
-        self.x = xvals
-        self.y = yvals
+        if yvals is None:
+            points = xvals if isinstance(xvals, np.memmap) else np.asarray(xvals)
+            xvals, yvals = points[:, 0], points[:, 1]
+        self.x = xvals if isinstance(xvals, np.memmap) else np.ascontiguousarray(xvals)
+        self.y = yvals if isinstance(yvals, np.memmap) else np.ascontiguousarray(yvals)
         self.colors = colors
         self.dict = {}
         self.collection = {"linear":self.linear, "handkerchief":self.handkerchief,\
@@ -38,6 +268,7 @@ class variations():
                             "fisheye":self.fisheye, "exponential":self.exponential}
 
 
+    @instrument("variations.fused", points=_size)
     def __call__(self, coeff):
         """ Calling on the class returns transfomed x-coords and y-coords
             corresponding to the coeffecients in coeff
@@ -53,21 +284,50 @@ class variations():
             Two arrays containing the transformed x-coords and y-coords respectively
 
         """
-        u = np.zeros(self.x.shape)
-        v = np.zeros(self.y.shape)
-        coeff_sum = 0
-        for key in coeff:
-            u_temp, v_temp = self.collection[key]()
-            u = u + coeff[key]*u_temp
-            v = v + coeff[key]*v_temp
-            coeff_sum = coeff_sum + coeff[key]
+        coeff_sum = sum(coeff.values())
         assert (abs(coeff_sum-1)<(1/10000)), \
         "coeffecients in input dictionary must sum to 1"
 
+        u, v = fused_variation(self.x, self.y, coeff)
         self.u = u
         self.v = v
         return u, v
 
+    @instrument("variations.offsets", points=_size)
+    def offsets(self, coeff, out=None):
+        """ Returns the plotted coordinates (u, -v) of the weighted sum of
+            the variations in coeff as one array of shape (N, 2), as used by
+            matplotlib's set_offsets.
+
+            Parameters
+            ----------
+            coeff: A dictionary where the keys are string containing method
+                   names and corresponding coeffecients
+            out: Optional preallocated array of shape (N, 2) the result is
+                 written into; with contiguous columns, as the default
+                 Fortran ordered one, nothing is allocated per call.
+
+            Returns
+            -------
+            The array of shape (N, 2) with the coordinates.
+
+        """
+        if out is None:
+            out = np.empty((len(self.x), 2), np.result_type(self.x.dtype, np.float32), order="F")
+        u, v = out[:, 0], out[:, 1]
+        fused_variation(self.x, self.y, coeff, u, v, scratch=self._scratch(out.dtype))
+        np.negative(v, out=v)
+        return out
+
+    def _scratch(self, dtype):
+        """ Work buffers of fused_variation, kept between calls."""
+        size = min(CHUNK_SIZE, self.x.size) or 1
+        scratch = getattr(self, "_work", None)
+        if scratch is None or scratch[0].dtype != dtype:
+            scratch = self._work = [np.empty(size, dtype) for _ in range(7)]
+        return scratch
+
+    @instrument("variations.linear", points=_size)
     def linear(self):
         """ Method that simply returns the x and y coords as is and stores
             the result internally.
@@ -88,6 +348,7 @@ class variations():
         self.v = v
         return u,v
 
+    @instrument("variations.handkerchief", points=_size)
     def handkerchief(self):
         """ Method that transforms the x and y coords according to the
             handkerchief equations, stores them internally and returns them.
@@ -110,6 +371,7 @@ class variations():
         self.v = v
         return u,v
 
+    @instrument("variations.swirl", points=_size)
     def swirl(self):
         """ Method that transforms the x and y coords according to the
             swirl equations, stores them internally and returns them.
@@ -131,6 +393,7 @@ class variations():
         self.v = v
         return u,v
 
+    @instrument("variations.disc", points=_size)
     def disc(self):
         """ Method that transforms the x and y coords according to the
             disc equations, stores them internally and returns them.
@@ -153,6 +416,7 @@ class variations():
         self.v = v
         return u,v
 
+    @instrument("variations.fisheye", points=_size)
     def fisheye(self):
         """ Method that transforms the x and y coords according to the
             fisheye equations, stores them internally and returns them.
@@ -174,6 +438,7 @@ class variations():
         self.v = v
         return u,v
 
+    @instrument("variations.exponential", points=_size)
     def exponential(self):
         """ Method that transforms the x and y coords according to the
             exponential equations, stores them internally and returns them.
@@ -188,12 +453,13 @@ class variations():
             Two arrays containing the transformed x-coords and y-coords respectively.
 
         """
-        u = np.exp(self.x-1)*np.cos(np.pi*y)
-        v = np.exp(self.x-1)*np.sin(np.pi*y)
+        u = np.exp(self.x-1)*np.cos(np.pi*self.y)
+        v = np.exp(self.x-1)*np.sin(np.pi*self.y)
         self.u = u
         self.v = v
         return u,v
 
+    @instrument("variations.plot", points=_size)
     def plot(self, cmap="jet"):
         """ Method that plots the internally stored transformed x and y coords.
 
@@ -207,11 +473,13 @@ class variations():
             Nothing.
 
         """
+        plt = pyplot()
         plt.scatter(self.u, -self.v, c=self.colors, cmap=cmap, s=0.1)
         plt.axis("equal")
         plt.axis("off")
 
-    def savepng(self, outfile, cmap_name="jet"):
+    @instrument("variations.savepng", points=_size)
+    def savepng(self, outfile, cmap_name="jet", resolution=2048, supersample=1, raster=True):
         """ Stores the transformed fractal as a png picture.
 
             Parameters
@@ -219,6 +487,11 @@ class variations():
 
             outfile: The outfiles filename
             cmap_name: Is a cmap compatible with matplotlib.pyplot.scatter().
+            resolution: Int or (width, height) of the picture in pixels.
+            supersample: Subpixels per pixel side used for antialiasing, e.g.
+                         2; it costs supersample**2 times the memory.
+            raster: If True the points are binned straight into a pixel
+                    buffer, if False the matplotlib scatter plot is saved.
 
 
             Returns
@@ -226,17 +499,17 @@ class variations():
             Nothing.
 
         """
-        name, ext = os.path.splitext(outfile)
+        filename = png_filename(outfile)
 
-        if ext == ".png":
-            filename = outfile
-        elif not ext:
-            filename = name + ".png"
-        else:
-            raise NameError ("Only accepted file extension is png")
+        if raster:
+            points = np.column_stack((self.u, -self.v))
+            image = rasterize(points, self.colors, resolution, cmap_name=cmap_name,
+                              supersample=supersample)
+            write_png(filename, image)
+            return
 
-        self.plot(self, cmap_name="jet")
-        plt.savefig(filename, dpi=300, transparent=True)
+        self.plot(cmap_name)
+        pyplot().savefig(filename, dpi=300, transparent=True)
 
     def create_animation(self, dict_start, dict_end, t, cmap="jet"):
         """ Creates an animation from one variation to another at 60 fps.
@@ -256,11 +529,13 @@ class variations():
 
         """
 
+        from matplotlib import animation
+        plt = pyplot()
         fig = plt.figure("Animation",figsize=(9, 9))
         plt.axes(xlim=(-1,1), ylim=(-1,1))
         plt.axis('off')
-        self(dict_start)
-        self.frame = plt.scatter(self.u, -self.v, c=self.colors, cmap=cmap, s=0.1)
+        self._frame_offsets = self.offsets(dict_start)
+        self.frame = plt.scatter(*self._frame_offsets.T, c=self.colors, cmap=cmap, s=0.1)
         self.dictdata = {}
         self.keys = []
         for key in dict_start:
@@ -273,6 +548,7 @@ class variations():
                                                  interval=1/60,
                                                  blit=True)
 
+    @instrument("variations.frame", points=_size)
     def _next_frame(self, i):
         """ Creates the next frame of the animation.
 
@@ -286,14 +562,15 @@ class variations():
             -------
             Nothing.
 
+            The coordinates are computed into the buffer allocated by
+            create_animation, so no arrays are allocated per frame.
+
         """
         dict = {}
         for key in self.keys:
             values = self.dictdata[key]
             dict[key] = values[i]
-        self(dict)
-        points = np.array([self.u,-self.v]).transpose()
-        self.frame.set_offsets(points)
+        self.frame.set_offsets(self.offsets(dict, self._frame_offsets))
         return self.frame,
 
 
@@ -323,14 +600,155 @@ class variations():
             raise NameError ("Only accepted file extension is mp4")
         self.animation.save(filename, fps=fps)
 
+    def _variation_cache(self, keys):
+        """ Computes every variation in keys once and returns the outputs
+            stacked as an array of shape (len(keys), 2, N) with rows u and -v,
+            which are the plotted coordinates.
+
+        """
+        cache = np.empty((len(keys), 2) + self.x.shape, np.result_type(self.x.dtype, np.float32))
+        for k, key in enumerate(keys):
+            fused_variation(self.x, self.y, {key: 1}, cache[k, 0], cache[k, 1])
+            np.negative(cache[k, 1], out=cache[k, 1])
+        return cache
+
+    def animation_frames(self, dict_start, dict_end, t, fps=60, resolution=512,
+                         extent=(-1, 1, -1, 1), cmap="jet", workers=None):
+        """ Generates the frames of an animation from one variation to another
+            as rasterized density images.
+
+            Every variation is computed only once, after which each frame is
+            a linear blend of the cached outputs. The frames are rendered in
+            a pool of worker processes and yielded in order.
+
+            Parameters
+            ----------
+
+            dict_start: Dictionary containing the start values for the
+                        variation coeffecients
+            dict_end: Dictionary containing the end values for the
+                      variation coeffecients
+            t: Duration of the animation in seconds.
+            fps: Frames per second.
+            resolution: Int or (width, height) of the frames in pixels.
+            extent: (xmin, xmax, ymin, ymax) of the region shown.
+            cmap: Is a cmap compatible with matplotlib.
+            workers: Number of worker processes, None for one per cpu and
+                     1 to render in this process.
+
+            Returns
+            -------
+            Generator of uint8 RGB images of shape (height, width, 3).
+
+        """
+        keys = list(dict_start)
+        frames = int(round(t*fps))
+        weights = np.array([np.linspace(dict_start[key], dict_end.get(key, 0), frames) for key in keys]).T
+        colors = None if isinstance(self.colors, str) else np.asarray(self.colors, dtype=np.float32)
+        state = {"cache": self._variation_cache(keys), "weights": weights,
+                 "colors": colors, "resolution": resolution,
+                 "extent": extent, "cmap": cmap}
+
+        if workers == 1:
+            _init_frames(state)
+            for i in range(frames):
+                yield _render_frame(i)
+            return
+
+        with ProcessPoolExecutor(workers, initializer=_init_frames, initargs=(state,)) as pool:
+            yield from pool.map(_render_frame, range(frames), chunksize=4)
+
+    def render_animation(self, dict_start, dict_end, t, filename, fps=60, resolution=512,
+                         extent=(-1, 1, -1, 1), cmap="jet", workers=None):
+        """ Renders an animation from one variation to another and streams the
+            frames straight into an ffmpeg encoder.
+
+            Parameters
+            ----------
+
+            filename: The name you want the mp4 file to have.
+            The other parameters are described in the method animation_frames.
+
+            Returns
+            -------
+            Nothing.
+
+        """
+        name, ext = os.path.splitext(filename)
+
+        if ext == ".mp4":
+            filename = filename
+        elif not ext:
+            filename = name + ".mp4"
+        else:
+            raise NameError ("Only accepted file extension is mp4")
+
+        encoder = None
+        try:
+            for frame in self.animation_frames(dict_start, dict_end, t, fps, resolution,
+                                               extent, cmap, workers):
+                if encoder is None:
+                    height, width, _ = frame.shape
+                    encoder = subprocess.Popen(
+                        ["ffmpeg", "-y", "-loglevel", "error", "-f", "rawvideo",
+                         "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(fps),
+                         "-i", "-", "-pix_fmt", "yuv420p", filename],
+                        stdin=subprocess.PIPE)
+                encoder.stdin.write(frame.tobytes())
+        finally:
+            if encoder is not None:
+                encoder.stdin.close()
+                if encoder.wait() != 0:
+                    raise RuntimeError(f"ffmpeg failed to encode {filename}")
+
+
+#: data shared by the frames of animation_frames, set once per worker process
+_frame_state = {}
+
+
+def _init_frames(state):
+    _frame_state.clear()
+    _frame_state.update(state)
+    cache = state["cache"]
+    _frame_state["points"] = np.empty(cache.shape[1:], cache.dtype)
+    _frame_state["term"] = np.empty(cache.shape[1:], cache.dtype)
+
+
+@instrument("variations.render_frame", points=lambda i: _frame_state["cache"].shape[-1])
+def _render_frame(i):
+    """ Blends the cached variations for frame i and rasterizes them as an
+        RGB image with the points drawn on a white background.
+
+    """
+    state = _frame_state
+    points, term = state["points"], state["term"]
+    points[:] = 0
+    for weight, variation in zip(state["weights"][i], state["cache"]):
+        np.multiply(variation, weight, out=term)
+        np.add(points, term, out=points)
+    colors = state["colors"]
+    channels = colors.shape[1] if colors is not None and colors.ndim == 2 else colors is not None
+    histogram = DensityHistogram(state["resolution"], state["extent"], channels)
+    histogram.add(points.T, colors)
+    color_range = None if colors is None else (colors.min(), colors.max())
+    image = histogram.image(state["cmap"], color_range)
+
+    alpha = image[:, :, 3:] / 255
+    return (255 - alpha*(255 - image[:, :, :3])).round().astype(np.uint8)
+
+
 def plot_grid():
     #Plots a simple grid for vizualisation purposes
+    plt = pyplot()
     plt.plot([-1, 1, 1, -1, -1], [-1, -1, 1, 1, -1], color="grey")
     plt.plot([-1, 1], [0, 0], color="grey")
     plt.plot([0, 0], [-1, 1], color="grey")
 
 
 if __name__=="__main__":
+    from cache import AttractorCache
+    plt = pyplot()
+    attractors = AttractorCache()
 
     varmethod = ["linear", "handkerchief", "swirl", "disc"]
 
@@ -359,12 +777,8 @@ if __name__=="__main__":
         linear, disc, swirl and handkerchief.
 
     """
-    square = cg.ChaosGame(4,1/3)
-    square.iterate(10000)
-    x = square.X[:,0]
-    y = square.X[:,1]
-    color = square.color
-    squares = variations(x,-y,color)
+    square = attractors.chaos_game(4, 1/3, 10000)
+    squares = variations(square.X * (1, -1), colors=square.color)
     plt.figure("4-gon",figsize=(9, 9))
     for i in range(4):
         plt.subplot(2,2,i+1)
@@ -378,13 +792,9 @@ if __name__=="__main__":
         linear, disc, swirl and handkerchief.
 
     """
-    fern = fern_maker()
-    x = fern[:,0]
-    y = fern[:,1]
-    max = (np.sqrt(x**2+y**2)).max()
-    x = x/max
-    y = y/max
-    ferns = variations(x,-y,"green")
+    fern = attractors.fern()
+    max = np.hypot(fern[:,0], fern[:,1]).max()
+    ferns = variations(fern * (1/max, -1/max), colors="green")
     plt.figure("Ferns",figsize=(9, 9))
     for i in range(4):
         plt.subplot(2,2,i+1)
@@ -413,12 +823,8 @@ if __name__=="__main__":
         seconds and saves the file.
 
     """
-    sixgon = cg.ChaosGame(6,1/3)
-    sixgon.iterate(10000)
-    x = sixgon.X[:,0]
-    y = sixgon.X[:,1]
-    color = sixgon.color
-    sixgons = variations(x,-y,color)
+    sixgon = attractors.chaos_game(6, 1/3, 10000)
+    sixgons = variations(sixgon.X * (1, -1), colors=sixgon.color)
     dict_start = {"linear":1, "disc":0, "handkerchief":0, "exponential":0}
     dict_end = {"linear":0, "disc":0.5, "handkerchief":0.1, "exponential":0.4}
     sixgons.create_animation(dict_start, dict_end, 10)